@@ -0,0 +1,299 @@
+"""Script to count emoji in exported channel history, without asking Discord for it"""
+import argparse
+from collections import Counter, namedtuple
+from concurrent.futures import ProcessPoolExecutor
+import json
+import logging
+import mmap
+import os
+import re
+import sys
+
+from bot_actions.emoji_extractor import EmojiExtractor, is_unicode_key
+from bot_actions.report_renderer import FOOTER, get_report_lines, to_csv
+
+# NDJSON files are split into parts of about this size, every part is counted by its process
+DEFAULT_CHUNK_MB = 64
+NDJSON_EXTENSIONS = ('.ndjson', '.jsonl')
+# JSON documents are read by parts of this many characters
+READ_CHUNK_CHARS = 1024 * 1024
+
+# custom emoji in the text with the animated flag, name and id groups
+CUSTOM_EMOJI_NAMES = re.compile('<(a?):([a-zA-Z0-9_]+):([0-9]+)>')
+JSON_WHITESPACE = re.compile('[ \t\r\n]*')
+
+# Message objects have just enough of the discord.Message interface for the EmojiExtractor
+ArchiveAuthor = namedtuple('ArchiveAuthor', 'id')
+# id of the unknown author, discord ids are never 0, so it's never the bot, even without --bot-id
+UNKNOWN_AUTHOR_ID = 0
+
+
+class ArchiveEmoji(namedtuple('ArchiveEmoji', 'id name animated')):
+    '''Emoji of the archive, custom ones are shown in the report like discord.Emoji'''
+    __slots__ = ()
+
+    def __str__(self):
+        return f"<{'a' if self.animated else ''}:{self.name or 'emoji'}:{self.id}>"
+
+
+ArchiveReaction = namedtuple('ArchiveReaction', 'emoji count custom_emoji')
+ArchiveMessage = namedtuple('ArchiveMessage', 'author content reactions')
+
+
+class AnyEmojiLookup(dict):
+    '''
+    Emoji lookup of the extractor for archives, where the server emoji are unknown.
+    Every custom emoji is counted, by its id, unicode emoji are counted as usual.
+    '''
+
+    def get(self, emoji_id, default=None):
+        return emoji_id
+
+
+def to_message(record: dict, names: {str: ArchiveEmoji}) -> ArchiveMessage:
+    '''
+    Converts message from the archive (Discord API or DiscordChatExporter format) to the object,
+    the extractor can count. Custom emoji of the text and reactions are stored to the names.
+    '''
+    author_id = (record.get('author') or {}).get('id')
+    content = record.get('content') or ''
+    if '<' in content:
+        for animated, name, emoji_id in CUSTOM_EMOJI_NAMES.findall(content):
+            if emoji_id not in names:
+                names[emoji_id] = ArchiveEmoji(emoji_id, name, bool(animated))
+
+    reactions = []
+    for reaction in record.get('reactions') or ():
+        emoji = reaction.get('emoji') or {}
+        emoji_id = emoji.get('id')
+        # Discord API calls it animated, DiscordChatExporter calls it isAnimated
+        archive_emoji = ArchiveEmoji(emoji_id, emoji.get('name'),
+                                     bool(emoji.get('animated') or emoji.get('isAnimated')))
+        if emoji_id:
+            names[str(emoji_id)] = archive_emoji
+        reactions.append(ArchiveReaction(archive_emoji, int(reaction.get('count') or 0),
+                                         bool(emoji_id)))
+    return ArchiveMessage(ArchiveAuthor(int(author_id) if author_id else UNKNOWN_AUTHOR_ID),
+                          content, reactions)
+
+
+def create_extractor(bot_id: int) -> EmojiExtractor:
+    '''Returns the extractor, that counts any custom emoji'''
+    extractor = EmojiExtractor((), bot_id)
+    extractor.emoji_by_id = AnyEmojiLookup()
+    return extractor
+
+
+def count_lines(path: str, start: int, stop: int, bot_id: int) \
+        -> (Counter, {str: ArchiveEmoji}):
+    '''
+    Counts emoji in NDJSON messages between start and stop bytes of the file.
+    Returns counter of emoji ids and the custom emoji, that were found.
+    '''
+    extractor = create_extractor(bot_id)
+    names = dict()
+    skipped = 0
+    with open(path, 'rb') as archive, \
+            mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        position = start
+        while position < stop:
+            end = data.find(b'\n', position, stop)
+            if end == -1:
+                end = stop
+            line = data[position:end]
+            position = end + 1
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line.decode('utf-8'))
+            except ValueError:
+                skipped += 1
+                continue
+            extractor.count_message(to_message(record, names))
+
+    if skipped:
+        logging.warning('Skipped %d broken lines in %s', skipped, path)
+    return extractor.counter, names
+
+
+class JsonStream:
+    '''
+    Reads JSON values one by one from the text file, so big documents are never loaded whole.
+    Only the unread part of the last chunk is kept in memory.
+    '''
+
+    def __init__(self, file, chunk_chars=READ_CHUNK_CHARS):
+        self.file = file
+        self.chunk_chars = chunk_chars
+        self.decoder = json.JSONDecoder()
+        self.buffer = ''
+        self.position = 0
+        self.eof = False
+
+    def read_more(self):
+        '''Drops the read part of the buffer and adds the next chunk of the file'''
+        chunk = self.file.read(self.chunk_chars)
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+        self.eof = not chunk
+
+    def peek(self) -> str:
+        '''Skips whitespace and returns the next character, empty string at the end of file'''
+        while True:
+            self.position = JSON_WHITESPACE.match(self.buffer, self.position).end()
+            if self.position < len(self.buffer) or self.eof:
+                return self.buffer[self.position:self.position + 1]
+            self.read_more()
+
+    def expect(self, characters: str) -> str:
+        '''Reads the next character, that should be one of the characters'''
+        character = self.peek()
+        if not character or character not in characters:
+            raise ValueError(f'Expected one of {characters!r}, got {character!r}')
+        self.position += 1
+        return character
+
+    def decode(self):
+        '''Reads the next JSON value'''
+        self.peek()
+        while True:
+            try:
+                value, end = self.decoder.raw_decode(self.buffer, self.position)
+                # numbers can continue in the next chunk, so something should follow the value
+                if end < len(self.buffer) or self.eof:
+                    self.position = end
+                    return value
+            except ValueError:
+                if self.eof:
+                    raise
+            self.read_more()
+
+    def iterate_list(self):
+        '''Yields items of the JSON list'''
+        self.expect('[')
+        if self.peek() == ']':
+            self.position += 1
+            return
+        while True:
+            yield self.decode()
+            if self.expect(',]') == ']':
+                return
+
+
+def iterate_records(stream: JsonStream):
+    '''Yields messages of the document, that is a list or an object with the "messages" list'''
+    if stream.peek() == '[':
+        yield from stream.iterate_list()
+        return
+
+    stream.expect('{')
+    if stream.peek() == '}':
+        return
+    while True:
+        key = stream.decode()
+        stream.expect(':')
+        if key == 'messages' and stream.peek() == '[':
+            yield from stream.iterate_list()
+        else:
+            stream.decode()  # other fields, like the guild and the channel of the export
+        if stream.expect(',}') == '}':
+            return
+
+
+def count_document(path: str, bot_id: int) -> (Counter, {str: ArchiveEmoji}):
+    '''
+    Counts emoji in JSON document, that is a list of messages or an object with "messages" list.
+    Returns counter of emoji ids and the custom emoji, that were found.
+    '''
+    extractor = create_extractor(bot_id)
+    names = dict()
+    with open(path, encoding='utf-8') as archive:
+        for record in iterate_records(JsonStream(archive)):
+            extractor.count_message(to_message(record, names))
+    return extractor.counter, names
+
+
+def split_lines(path: str, chunk_bytes: int) -> [(int, int)]:
+    '''Splits the file into (start, stop) byte ranges of about chunk_bytes, ending at new lines'''
+    size = os.path.getsize(path)
+    ranges = []
+    with open(path, 'rb') as archive, \
+            mmap.mmap(archive.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        start = 0
+        while start < size:
+            stop = data.find(b'\n', min(start + chunk_bytes, size))
+            stop = size if stop == -1 else stop + 1
+            ranges.append((start, stop))
+            start = stop
+    return ranges
+
+
+def get_tasks(path: str, chunk_bytes: int, bot_id: int) -> list:
+    '''Returns (function, arguments) to count emoji in the file'''
+    if not os.path.getsize(path):
+        return []  # empty files can't be mapped
+    if path.lower().endswith(NDJSON_EXTENSIONS):
+        return [(count_lines, (path, start, stop, bot_id))
+                for start, stop in split_lines(path, chunk_bytes)]
+    # JSON document can't be split by lines, so the whole file goes to one process
+    return [(count_document, (path, bot_id))]
+
+
+def get_emojis(counter: Counter, names: {str: ArchiveEmoji}) -> [(ArchiveEmoji, int)]:
+    '''Returns counted emoji sorted by amount, in increasing order, like the CountEmoji action'''
+    emojis = []
+    for key, amount in sorted(counter.items(), key=lambda item: item[1]):
+        if not is_unicode_key(key):
+            key = names.get(key) or ArchiveEmoji(key, None, False)
+        emojis.append((key, amount))
+    return emojis
+
+
+def format_report(emojis: [(ArchiveEmoji, int)]) -> str:
+    '''Returns report with the same lines as the CountEmoji action sends to the chat'''
+    lines = ['We found the following emojis in the archive:']
+    lines.extend(get_report_lines(emojis))
+    lines.append(FOOTER)
+    return '\n'.join(lines)
+
+
+def main():
+    '''Counts emoji in all archive files and prints the report'''
+    parser = argparse.ArgumentParser(description='Counts emoji in NDJSON/JSON history exports')
+    parser.add_argument('files', nargs='+', help='.ndjson/.jsonl files with message per line '
+                                                 'or .json files with a list of messages')
+    parser.add_argument('--bot-id', type=int, help="id of the bot, its messages aren't counted")
+    parser.add_argument('--processes', type=int, help='amount of processes, CPU count by default')
+    parser.add_argument('--chunk-mb', type=int, default=DEFAULT_CHUNK_MB,
+                        help='size of NDJSON parts counted by one process')
+    parser.add_argument('--csv', help='file to save the report in CSV format, like the bot does '
+                                      'for big reports')
+    arguments = parser.parse_args()
+
+    counter = Counter()
+    names = dict()
+    try:
+        tasks = []
+        for path in arguments.files:
+            tasks.extend(get_tasks(path, max(1, arguments.chunk_mb) * 1024 * 1024,
+                                   arguments.bot_id))
+
+        with ProcessPoolExecutor(arguments.processes) as pool:
+            futures = [pool.submit(function, *task_arguments)
+                       for function, task_arguments in tasks]
+            for future in futures:
+                part_counter, part_names = future.result()
+                counter.update(part_counter)
+                names.update(part_names)
+    except (OSError, ValueError) as error:
+        sys.exit(f"Can't read the archive: {error}")
+
+    emojis = get_emojis(counter, names)
+    if arguments.csv:
+        with open(arguments.csv, 'wb') as csv_file:
+            csv_file.write(to_csv(emojis))
+    print(format_report(emojis))
+
+
+if __name__ == '__main__':
+    main()
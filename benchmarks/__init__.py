@@ -0,0 +1,4 @@
+'''
+Offline benchmarks for the bot, that don't need a Discord connection.
+Run them as modules, like 'python -m benchmarks.hot_path' or 'python -m benchmarks.time_parsing'
+'''
@@ -0,0 +1,217 @@
+'''Lightweight stand-ins for discord objects, enough to drive the bot without a connection'''
+from datetime import datetime, timedelta
+import itertools
+
+from discord import ChannelType
+from discord.utils import time_snowflake
+
+# discord returns history in pages of 100 messages
+HISTORY_PAGE_SIZE = 100
+
+_IDS = itertools.count(1)
+
+
+class FakeEmoji:
+    '''Stand-in for discord.Emoji'''
+
+    def __init__(self, name: str, animated=False):
+        self.id = next(_IDS)
+        self.name = name
+        self.animated = animated
+
+    def __str__(self):
+        return f"<{'a' if self.animated else ''}:{self.name}:{self.id}>"
+
+
+class FakeRole:
+    '''Stand-in for discord.Role'''
+
+    def __init__(self, name: str):
+        self.id = next(_IDS)
+        self.name = name
+
+    def __str__(self):
+        return self.name
+
+
+class FakePermissions:
+    '''Stand-in for discord.Permissions'''
+
+    def __init__(self, administrator=False):
+        self.administrator = administrator
+
+
+class FakeMember:
+    '''Stand-in for discord.Member'''
+
+    def __init__(self, name: str, guild=None, roles=(), bot=False, administrator=False):
+        self.id = next(_IDS)
+        self.name = name
+        self.display_name = name
+        self.discriminator = '0001'
+        self.guild = guild
+        self.roles = list(roles)
+        self.bot = bot
+        self.guild_permissions = FakePermissions(administrator)
+
+    def __str__(self):
+        return f'{self.name}#{self.discriminator}'
+
+
+class FakeReaction:
+    '''Stand-in for discord.Reaction'''
+
+    def __init__(self, emoji, count: int):
+        self.emoji = emoji
+        self.count = count
+        self.custom_emoji = not isinstance(emoji, str)
+
+
+class FakeMessage:
+    '''Stand-in for discord.Message'''
+
+    def __init__(self, content: str, author, channel, created_at=None, reactions=()):
+        self.created_at = created_at or datetime.utcnow()
+        self.id = time_snowflake(self.created_at) + next(_IDS) % (1 << 22)
+        self.content = content
+        self.author = author
+        self.channel = channel
+        self.guild = channel.guild if channel else None
+        self.reactions = list(reactions)
+
+    async def edit(self, content=None, **kwargs):
+        '''Changes the message content in place'''
+        self.content = content
+        self.kwargs = kwargs
+
+
+class FakeTyping:
+    '''Stand-in for the channel.typing() context manager'''
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return False
+
+
+class FakeTextChannel:
+    '''
+    Stand-in for discord.TextChannel.
+    Stores messages in memory, counts history pages and collects sent messages
+    '''
+
+    def __init__(self, name: str, guild=None):
+        self.id = next(_IDS)
+        self.name = name
+        self.guild = guild
+        self.type = ChannelType.text
+        self.messages = []  # sorted from oldest to newest
+        self.sent = []
+        self.pages_fetched = 0
+
+    def __str__(self):
+        return self.name
+
+    def history(self, limit=None, before=None, after=None, oldest_first=None):
+        '''
+        Returns async iterator over messages, fetching them by pages like discord.py does:
+        pages are read back from before (or forward from after for oldest_first) and the other
+        bound only filters messages of every page, so pages go on till the end of the history,
+        unless the caller stops.
+        '''
+        if oldest_first is None:
+            oldest_first = after is not None
+
+        after_id = getattr(after, 'id', None)
+
+        def is_after(msg):
+            if after is None:
+                return True
+            return msg.id > after_id if after_id is not None else msg.created_at > after
+
+        def is_before(msg):
+            return before is None or msg.created_at < before
+
+        if oldest_first:
+            messages = (msg for msg in self.messages if is_after(msg))
+            return self._iterate_pages(messages, is_before, limit)
+        messages = (msg for msg in reversed(self.messages) if is_before(msg))
+        return self._iterate_pages(messages, is_after, limit)
+
+    async def _iterate_pages(self, messages, is_kept, limit):
+        yielded = 0
+        while limit is None or yielded < limit:
+            page = list(itertools.islice(messages, HISTORY_PAGE_SIZE))
+            self.pages_fetched += 1
+            if not page:
+                return
+            for msg in page:
+                if is_kept(msg) and (limit is None or yielded < limit):
+                    yielded += 1
+                    yield msg
+            if len(page) < HISTORY_PAGE_SIZE:
+                return
+
+    async def send(self, content=None, **kwargs):
+        '''Collects the sent message instead of sending it'''
+        message = FakeMessage(content or '', None, self)
+        message.kwargs = kwargs
+        self.sent.append(message)
+        return message
+
+    def typing(self):
+        '''Returns typing context manager'''
+        return FakeTyping()
+
+
+class FakeGuild:
+    '''Stand-in for discord.Guild'''
+
+    def __init__(self, name: str):
+        self.id = next(_IDS)
+        self.name = name
+        self.emojis = []
+        self.channels = []
+        self.roles = []
+        self.members = []
+
+
+class FakeClient:
+    '''Stand-in for discord.Client, only the bot user is needed'''
+
+    def __init__(self, name='FoODbOT'):
+        self.user = FakeMember(name, bot=True)
+
+
+def make_guild(channels=10, emojis=50, members=100, messages_per_channel=1000,
+               emoji_per_message=0.5, period=timedelta(days=7), end=None) -> FakeGuild:
+    '''
+    Creates a guild with channels filled by messages evenly spread over the period,
+    that ends at end (now by default)
+    '''
+    guild = FakeGuild('Benchmark guild')
+    guild.emojis = [FakeEmoji(f'emoji{index}') for index in range(emojis)]
+    guild.roles = [FakeRole('Devs'), FakeRole('Members')]
+    guild.members = [FakeMember(f'user{index}', guild, [guild.roles[index % 2]])
+                     for index in range(members)]
+
+    now = end or datetime.utcnow()
+    step = period / max(messages_per_channel, 1)
+    counter = itertools.count()
+    for channel_index in range(channels):
+        channel = FakeTextChannel(f'channel{channel_index}', guild)
+        for index in range(messages_per_channel):
+            number = next(counter)
+            content = 'Just a message about food'
+            # every emoji_per_message-th message gets an emoji
+            if emoji_per_message and number % max(int(1 / emoji_per_message), 1) == 0:
+                content += f' {guild.emojis[number % emojis]}'
+            reactions = []
+            if number % 10 == 0:
+                reactions.append(FakeReaction(guild.emojis[(number * 7) % emojis], 3))
+            author = guild.members[number % members]
+            created_at = now - period + step * index
+            channel.messages.append(FakeMessage(content, author, channel, created_at, reactions))
+        guild.channels.append(channel)
+    return guild
@@ -0,0 +1,93 @@
+'''
+Check, that the history scan grows linearly with the counted window: a channel with twice
+as many messages in the window takes twice as many history pages and about twice as much
+CPU time. Channels have OLD_HISTORY times more messages before the window, the scan should
+stop at the window start, not read them.
+Run as 'python -m benchmarks.history_scaling [--messages 5000] [--steps 3]',
+exits with an error, if the growth isn't linear.
+'''
+import argparse
+import asyncio
+from datetime import datetime, timedelta
+import logging
+import sys
+import time
+
+from bot_actions import functions
+from bot_actions.emoji_counter import EmojiCounter
+from bot_actions.emoji_extractor import EmojiExtractor
+from . import fakes
+
+# CPU time per message can differ this much between sizes, timing is noisy on small inputs
+CPU_TOLERANCE = 2.0
+# messages before the counted window for every message in it
+OLD_HISTORY = 4
+WINDOW = timedelta(days=7)
+# the scanned window is longer than the messages period by the margin, and older history
+# ends the margin before it, so the scan starts a little later than the messages are made
+MARGIN = timedelta(hours=12)
+
+
+def scan(messages: int) -> (int, float):
+    '''
+    Counts emoji in the window of the channel with that many messages in it,
+    returns pages and CPU seconds
+    '''
+    now = datetime.utcnow()
+    guild = fakes.make_guild(channels=1, messages_per_channel=messages, period=WINDOW, end=now)
+    client = fakes.FakeClient()
+    channel = guild.channels[0]
+    # older history, a month before the window
+    old_history = fakes.make_guild(channels=1, messages_per_channel=messages * OLD_HISTORY,
+                                   period=timedelta(days=30), end=now - WINDOW - MARGIN)
+    channel.messages[:0] = old_history.channels[0].messages
+    extractor = EmojiExtractor(guild.emojis, client.user.id)
+    loop = asyncio.get_event_loop()
+
+    start = time.process_time()
+    loop.run_until_complete(functions.handle_messages(client, channel, WINDOW + MARGIN,
+                                                      EmojiCounter.count_emoji_in_messages,
+                                                      extractor))
+    return channel.pages_fetched, time.process_time() - start
+
+
+def run(messages=5000, steps=3) -> [str]:
+    '''Scans histories doubling in size, prints the results and returns found problems'''
+    problems = []
+    base_seconds = None
+    for step in range(steps):
+        scale = 2 ** step
+        pages, seconds = scan(messages * scale)
+        print(f'{messages * scale} messages: {pages} pages, {seconds * 1e3:.1f} ms CPU')
+
+        # the last page has the first message before the window
+        expected_pages = messages * scale // functions.HISTORY_PAGE_SIZE + 1
+        if pages != expected_pages:
+            problems.append(f'{messages * scale} messages took {pages} pages '
+                            f'instead of {expected_pages}')
+        if base_seconds is None:
+            base_seconds = seconds
+        elif base_seconds and seconds / (base_seconds * scale) > CPU_TOLERANCE:
+            problems.append(f'CPU time grew {seconds / base_seconds:.1f}x '
+                            f'for {scale}x messages')
+    return problems
+
+
+def main():
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--messages', type=int, default=5000, help='messages of the first scan')
+    parser.add_argument('--steps', type=int, default=3, help='amount of doubled scans')
+    arguments = parser.parse_args()
+
+    logging.disable(logging.CRITICAL)
+    problems = run(arguments.messages, max(arguments.steps, 2))
+    for problem in problems:
+        print(problem)
+    if problems:
+        sys.exit(1)
+    print('History scan grows linearly')
+
+
+if __name__ == '__main__':
+    main()
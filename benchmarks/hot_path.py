@@ -0,0 +1,195 @@
+'''
+Offline benchmark of the message hot path.
+Run as 'python -m benchmarks.hot_path --output results.json [--compare old_results.json]'
+'''
+import argparse
+import asyncio
+import configparser
+from datetime import datetime, timedelta
+import json
+import logging
+import platform
+import subprocess
+import time
+import tracemalloc
+
+from bot_settings.settings import BotSettings
+from bot_actions import MessageHandler, functions
+from bot_actions.convert_time import ConvertTime
+from bot_actions.emoji_counter import EmojiCounter
+from bot_actions.emoji_extractor import EmojiExtractor
+from . import fakes, time_parsing
+
+
+def make_settings(config_path='settings.ini') -> BotSettings:
+    '''Creates bot settings from the settings file, without reading the mutable settings'''
+    bot_settings = BotSettings(config_path, '', read_on_init=False)
+    config = configparser.ConfigParser()
+    config.read(config_path)
+    bot_settings.read_action_settings(config, ['System', 'DEFAULT'])
+    bot_settings.build_permission_sets()
+    return bot_settings
+
+
+def summarize(latencies: [float], messages: int, seconds: float, peak_memory: int) -> dict:
+    '''Converts raw measurements to the report entry'''
+    latencies = sorted(latencies)
+
+    def percentile(fraction):
+        return latencies[int(round(fraction * (len(latencies) - 1)))] * 1e6 if latencies else 0
+
+    return {'messages': messages,
+            'seconds': seconds,
+            'messages_per_sec': messages / seconds if seconds else 0,
+            'p50_us': percentile(0.5),
+            'p99_us': percentile(0.99),
+            'peak_memory_kb': peak_memory / 1024}
+
+
+def measure(scenario, *args) -> dict:
+    '''Runs scenario, that returns (latencies, messages), tracking time and memory'''
+    tracemalloc.start()
+    start = time.perf_counter()
+    latencies, messages = scenario(*args)
+    seconds = time.perf_counter() - start
+    peak_memory = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return summarize(latencies, messages, seconds, peak_memory)
+
+
+def bench_parse_message(guild, bot_settings):
+    '''MessageHandler.parse_message on a mix of plain messages and commands'''
+    handler = MessageHandler(bot_settings)
+    commands = ['!help', '!convert 9:15 AM CST GMT+3', '!countemoji', '!unknown']
+    messages = []
+    for channel in guild.channels:
+        for index, message in enumerate(channel.messages):
+            if index % 10 == 0:
+                message = fakes.FakeMessage(commands[index % len(commands)], message.author,
+                                            channel, message.created_at)
+            messages.append(message)
+
+    latencies = []
+    for message in messages:
+        start = time.perf_counter()
+        handler.parse_message(message)
+        latencies.append(time.perf_counter() - start)
+    return latencies, len(messages)
+
+
+def bench_count_emoji(guild, client):
+    '''EmojiCounter.count_emoji_in_messages for every message of the guild'''
+    extractor = EmojiExtractor(guild.emojis, client.user.id)
+    latencies = []
+    messages = 0
+    for channel in guild.channels:
+        for message in channel.messages:
+            start = time.perf_counter()
+            EmojiCounter.count_emoji_in_messages(message, extractor, client.user.id)
+            latencies.append(time.perf_counter() - start)
+        messages += len(channel.messages)
+    return latencies, messages
+
+
+def bench_handle_messages(guild, client):
+    '''functions.handle_messages over every channel, latency is per channel scan'''
+    loop = asyncio.get_event_loop()
+    check_time = timedelta(days=8)
+    latencies = []
+    messages = 0
+    for channel in guild.channels:
+        extractor = EmojiExtractor(guild.emojis, client.user.id)
+        start = time.perf_counter()
+        loop.run_until_complete(functions.handle_messages(client, channel, check_time,
+                                                          EmojiCounter.count_emoji_in_messages,
+                                                          extractor))
+        latencies.append(time.perf_counter() - start)
+        messages += len(channel.messages)
+    return latencies, messages
+
+
+def bench_convert_time(guild, bot_settings, runs=2000):
+    '''ConvertTime.run_action with a fake response channel'''
+    loop = asyncio.get_event_loop()
+    channel = guild.channels[0]
+    author = guild.members[0]
+    inputs = ['9:15 AM CST GMT+3', '21:00 UTC EST', '9pm IST-5:30 GMT', '7:45pm PST CET']
+    action_settings = bot_settings.action_settings['ConvertTime']
+
+    latencies = []
+    for index in range(runs):
+        message = fakes.FakeMessage('!convert ' + inputs[index % len(inputs)], author, channel)
+        action = ConvertTime(message, inputs[index % len(inputs)].split(' '), bot_settings,
+                             action_settings)
+        action.response_channel = channel
+        start = time.perf_counter()
+        loop.run_until_complete(action.run_action())
+        latencies.append(time.perf_counter() - start)
+    channel.sent.clear()
+    return latencies, runs
+
+
+def get_revision() -> str:
+    '''Returns current git revision, if available'''
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       stderr=subprocess.DEVNULL).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return 'unknown'
+
+
+def run(channels=20, messages_per_channel=5000) -> dict:
+    '''Runs all scenarios and returns the report'''
+    guild = fakes.make_guild(channels=channels, messages_per_channel=messages_per_channel)
+    client = fakes.FakeClient()
+    bot_settings = make_settings()
+
+    results = {
+        'parse_message': measure(bench_parse_message, guild, bot_settings),
+        'count_emoji_in_messages': measure(bench_count_emoji, guild, client),
+        'handle_messages': measure(bench_handle_messages, guild, client),
+        'convert_time': measure(bench_convert_time, guild, bot_settings),
+        'time_parsing_us': time_parsing.run(),
+    }
+    return {'revision': get_revision(),
+            'python': platform.python_version(),
+            'date': datetime.utcnow().isoformat(),
+            'guild': {'channels': channels, 'messages_per_channel': messages_per_channel},
+            'results': results}
+
+
+def compare(report: dict, previous: dict):
+    '''Prints throughput change of every scenario against the previous report'''
+    print(f"Comparing {report['revision']} against {previous['revision']}")
+    for name, result in report['results'].items():
+        old_result = previous['results'].get(name)
+        if not old_result or 'messages_per_sec' not in result:
+            continue
+        ratio = result['messages_per_sec'] / old_result['messages_per_sec']
+        print(f'{name}: {ratio:.2f}x messages/sec')
+
+
+def main():
+    '''Command line entry point'''
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--output', help='file to save JSON report to')
+    parser.add_argument('--compare', help='previous JSON report to compare with')
+    parser.add_argument('--channels', type=int, default=20)
+    parser.add_argument('--messages', type=int, default=5000, help='messages per channel')
+    arguments = parser.parse_args()
+
+    # the bot logs every command, it's not a part of the measurement
+    logging.disable(logging.CRITICAL)
+    report = run(arguments.channels, arguments.messages)
+    print(json.dumps(report['results'], indent=2))
+
+    if arguments.output:
+        with open(arguments.output, 'w') as output_file:
+            json.dump(report, output_file, indent=2)
+    if arguments.compare:
+        with open(arguments.compare) as previous_file:
+            compare(report, json.load(previous_file))
+
+
+if __name__ == '__main__':
+    main()
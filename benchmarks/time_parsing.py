@@ -0,0 +1,35 @@
+'''Micro-benchmark of the time parsing, used by the convert command'''
+from datetime import datetime
+import timeit
+
+from bot_actions import time_utils
+
+# inputs, that people were actually typing for !convert
+CORPUS = ['9:15 AM', '21:00', '9pm', '9 PM', '12 AM', '12:30', '7:45pm', '18:30', '10h30', '9.15',
+          '09-15', '1:00 pm', '23:59', '6 am', '9:5', '11:11 PM', '8', '17.00']
+
+
+def legacy_parse(time: str) -> datetime:
+    '''Parser as it was before the shape cache: infers the format and calls strptime every time'''
+    return datetime.strptime(time.upper(), time_utils.infer_time_format.__wrapped__(time))
+
+
+def run(repeat=2000) -> dict:
+    '''Returns microseconds per parsed string for the legacy and current parser'''
+    for time in CORPUS:
+        assert legacy_parse(time) == time_utils.get_datetime_from_strtime(time), time
+
+    results = dict()
+    for name, parse in (('legacy', legacy_parse),
+                        ('current', time_utils.get_datetime_from_strtime)):
+        seconds = min(timeit.repeat(lambda parse=parse: [parse(time) for time in CORPUS],
+                                    number=repeat, repeat=3))
+        results[name] = seconds / (repeat * len(CORPUS)) * 1e6
+    return results
+
+
+if __name__ == '__main__':
+    RESULTS = run()
+    for parser_name, microseconds in RESULTS.items():
+        print(f'{parser_name}: {microseconds:.2f} us per string')
+    print(f"speedup: {RESULTS['legacy'] / RESULTS['current']:.1f}x")
@@ -1,17 +1,86 @@
 """Script to start the FoODbOT"""
+# pylint: disable=wrong-import-position
+import sys
+import startup_profile
+PROFILER = startup_profile.StartupProfiler()
+if '--profile-startup' in sys.argv:
+    # installed before the other imports to measure them too
+    PROFILER.install()
+
+import argparse
 from datetime import datetime
 import logging
-from discord import Client
+import os
+import time
+from discord import AutoShardedClient, Client
 from bot_settings import settings
+from bot_settings.log_config import configure_logging
+from bot_settings.settings_watcher import SettingsWatcher
 from bot_actions import MessageHandler
+from bot_actions.emoji_extractor import get_reaction_key
+from bot_actions.emoji_index import open_index
+from bot_actions.listeners import EmojiIndexListener
+from bot_actions.functions import invalidate_authorization
+from bot_actions.result_cache import ResultCache
+
+# format of log lines of the shard processes, bot_shards.py parses it
+LOG_FORMAT = '%(levelname)s %(message)s'
+# pylint: enable=wrong-import-position
+
+
+def parse_arguments():
+    '''Parses command line, shard options are passed by the bot_shards.py supervisor'''
+    parser = argparse.ArgumentParser(description='Starts the FoODbOT')
+    parser.add_argument('--shard-ids', help='comma separated ids of shards to run in this process')
+    parser.add_argument('--shard-count', type=int, help='total amount of shards of the bot')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='print import and initialization time of modules, when ready')
+    arguments = parser.parse_args()
+    if bool(arguments.shard_ids) != bool(arguments.shard_count):
+        parser.error('--shard-ids and --shard-count should be used together')
+    if arguments.shard_ids:
+        arguments.shard_ids = [int(shard_id) for shard_id in arguments.shard_ids.split(',')]
+    return arguments
 
 
-SETTINGS = settings.BotSettings('settings.ini', 'mutableSettings.ini')
-CLIENT = Client()
-HANDLER = MessageHandler(SETTINGS)
+def get_shard_path(path: str, shard_ids: [int]) -> str:
+    '''Returns path of the file for the process running the shards, so processes don't clash'''
+    if not path or not shard_ids:
+        return path
+    root, extension = os.path.splitext(path)
+    return f"{root}-shards-{'-'.join(str(shard_id) for shard_id in shard_ids)}{extension}"
+
+
+ARGUMENTS = parse_arguments()
+if ARGUMENTS.shard_ids:
+    # the supervisor reads levels from the output to log it as its own
+    logging.basicConfig(format=LOG_FORMAT)
+with PROFILER.measure('read settings'):
+    SETTINGS = settings.BotSettings('settings.ini', 'mutableSettings.ini')
+# log level can be reloaded, the rest of logging settings requires a restart
+LOG_LISTENER = configure_logging(SETTINGS.system_settings,
+                                 get_shard_path(SETTINGS.system_settings.log_file,
+                                                ARGUMENTS.shard_ids),
+                                 LOG_FORMAT if ARGUMENTS.shard_ids else None)
+with PROFILER.measure('create client'):
+    if ARGUMENTS.shard_ids:
+        CLIENT = AutoShardedClient(shard_ids=ARGUMENTS.shard_ids,
+                                   shard_count=ARGUMENTS.shard_count)
+    else:
+        CLIENT = Client()
+COUNT_SETTINGS = SETTINGS.action_settings['CountEmoji'].settings
+with PROFILER.measure('open emoji index'):
+    EMOJI_INDEX = open_index(COUNT_SETTINGS.get('index_path'))
+RESULT_CACHE = ResultCache(int(COUNT_SETTINGS.get('result_cache_max_kb', 1024)) * 1024)
+with PROFILER.measure('create message handler'):
+    HANDLER = MessageHandler(SETTINGS, EMOJI_INDEX, RESULT_CACHE)
+if EMOJI_INDEX:
+    HANDLER.listeners.register(EmojiIndexListener(EMOJI_INDEX, CLIENT))
+WATCHER = SettingsWatcher(HANDLER, SETTINGS.system_settings.settings_reload_interval)
+if ARGUMENTS.shard_ids:
+    HANDLER.stats.labels['shards'] = ','.join(str(shard_id) for shard_id in ARGUMENTS.shard_ids)
 
 # todo: check emoji group before counting
-# todo: admins by roles
 
 
 @CLIENT.event
@@ -19,9 +88,38 @@ async def on_ready():
     '''Runs on the bot start'''
     logging.info('FoODbOT started as a %s, at %s', CLIENT.user.name, datetime.utcnow())
     logging.info('Bot ID is %d', CLIENT.user.id)
+    if ARGUMENTS.shard_ids:
+        logging.info('Running shards %s of %d', ARGUMENTS.shard_ids, ARGUMENTS.shard_count)
+    if EMOJI_INDEX:
+        EMOJI_INDEX.start_session()
+    WATCHER.start()
+    stats_settings = HANDLER.bot_settings.action_settings['Stats'].settings
+    HANDLER.stats.start_export(get_shard_path(stats_settings.get('export_file'),
+                                              ARGUMENTS.shard_ids),
+                               int(stats_settings.get('export_interval', 60)))
+    if ARGUMENTS.profile_startup:
+        PROFILER.uninstall()
+        print(PROFILER.format_report())
     print('------')
 
 
+@CLIENT.event
+async def on_disconnect():
+    '''Runs when the bot loses connection to Discord'''
+    if EMOJI_INDEX:
+        # other processes may share the index, so only the guilds of this one are touched
+        guild_ids = [guild.id for guild in CLIENT.guilds] if ARGUMENTS.shard_ids else None
+        await EMOJI_INDEX.run(EMOJI_INDEX.end_session, guild_ids)
+
+
+@CLIENT.event
+async def on_resumed():
+    '''Runs when the bot reconnects to Discord and gets the events missed while disconnected'''
+    if EMOJI_INDEX:
+        # after end_session of on_disconnect, as the index thread runs calls in order
+        await EMOJI_INDEX.run(EMOJI_INDEX.start_session, True)
+
+
 @CLIENT.event
 async def on_message(message):
     '''Runs at receiving the message'''
@@ -29,14 +127,108 @@ async def on_message(message):
         logging.error('Error! No message handler found!')
         return
 
+    # passive listeners get the message later, so they don't delay the commands
+    HANDLER.listeners.offer(message)
+
+    parse_start = time.perf_counter()
     action = HANDLER.parse_message(message)
+    HANDLER.stats.record_parse(action, time.perf_counter() - parse_start)
     if not action:
         return
 
     action.client = CLIENT
     action.response_channel = message.channel
+    action.handler = HANDLER
     logging.info('Running action %s', action)
-    await action.run_action()
+    with HANDLER.stats.measure_execute(action):
+        await action.run_action()
     logging.info('Action %s finished', action)
 
-CLIENT.run(SETTINGS.system_settings.token)
+
+@CLIENT.event
+async def on_member_update(before, after):
+    '''Drops cached permission checks of the updated member'''
+    invalidate_authorization(HANDLER.bot_settings, after.guild.id, after.id)
+
+
+@CLIENT.event
+async def on_user_update(before, after):
+    '''Drops cached permission checks of the user, as lists can contain their name'''
+    invalidate_authorization(HANDLER.bot_settings, None, after.id)
+
+
+@CLIENT.event
+async def on_member_remove(member):
+    '''Drops cached permission checks of the member, that left the guild'''
+    invalidate_authorization(HANDLER.bot_settings, member.guild.id, member.id)
+
+
+@CLIENT.event
+async def on_guild_role_update(before, after):
+    '''Drops cached permission checks of the guild, as role names and permissions can change'''
+    invalidate_authorization(HANDLER.bot_settings, after.guild.id)
+
+
+@CLIENT.event
+async def on_guild_role_delete(role):
+    '''Drops cached permission checks of the guild'''
+    invalidate_authorization(HANDLER.bot_settings, role.guild.id)
+
+
+@CLIENT.event
+async def on_raw_message_edit(payload):
+    '''Keeps the emoji index up to date with edited messages'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.update_message_text, payload, CLIENT.user.id)
+
+
+@CLIENT.event
+async def on_raw_message_delete(payload):
+    '''Keeps the emoji index up to date with deleted messages'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.remove_messages, [payload.message_id],
+                              payload.guild_id)
+
+
+@CLIENT.event
+async def on_raw_bulk_message_delete(payload):
+    '''Keeps the emoji index up to date with deleted messages'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.remove_messages, payload.message_ids,
+                              payload.guild_id)
+
+
+@CLIENT.event
+async def on_raw_reaction_add(payload):
+    '''Keeps the emoji index up to date with added reactions'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.add_reaction, payload)
+
+
+@CLIENT.event
+async def on_raw_reaction_remove(payload):
+    '''Keeps the emoji index up to date with removed reactions'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.remove_reaction, payload)
+
+
+@CLIENT.event
+async def on_raw_reaction_clear(payload):
+    '''Keeps the emoji index up to date with cleared reactions'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.clear_reactions, payload.message_id, None,
+                              payload.guild_id)
+
+
+@CLIENT.event
+async def on_raw_reaction_clear_emoji(payload):
+    '''Keeps the emoji index up to date with cleared reactions'''
+    if EMOJI_INDEX:
+        await EMOJI_INDEX.run(EMOJI_INDEX.clear_reactions, payload.message_id,
+                              get_reaction_key(payload.emoji), payload.guild_id)
+
+try:
+    CLIENT.run(SETTINGS.system_settings.token)
+finally:
+    # writes the queued records
+    LOG_LISTENER.stop()
@@ -1,23 +1,41 @@
 '''File for functions, that implements bot functions'''
 
-from datetime import datetime
 import logging
 import discord
 from bot_settings import settings
-from .functions import get_action_by_command
+from bot_settings.log_config import SAMPLED
+from .functions import get_action_by_command, get_throttle_delay
+from .emoji_index import EmojiIndex
+from .stats import BotStats
+from .job_queue import JobScheduler
+from .result_cache import ResultCache
+from .dispatcher import OutboundDispatcher
+from .listeners import ListenerPipeline
+from .registry import ActionRegistry
+from .throttle import ActionThrottle
 from . import actions
 
 
 class MessageHandler:
     '''Class to handle commands to the bot'''
 
-    def __init__(self, bot_settings: settings.BotSettings):
+    def __init__(self, bot_settings: settings.BotSettings, emoji_index: EmojiIndex = None,
+                 result_cache: ResultCache = None):
         self.bot_settings = bot_settings
-        bot_settings.action_dict = {
-            "CountEmoji": actions.EmojiCounter,
-            "Help": actions.HelpMessage,
-            "ConvertTime": actions.ConvertTime
-        }
+        self.emoji_index = emoji_index
+        self.result_cache = result_cache
+        self.stats = BotStats()
+        system_settings = bot_settings.system_settings
+        self.job_scheduler = JobScheduler(system_settings.max_concurrent_jobs,
+                                          system_settings.max_guild_jobs)
+        self.dispatcher = OutboundDispatcher(self)
+        # queue size is read once, changing it requires a restart
+        self.listeners = ListenerPipeline(system_settings.listener_queue_size,
+                                          system_settings.listener_batch_size)
+        self.stats.listeners = self.listeners
+        self.throttle = ActionThrottle()
+        # entry points are read once, changing them requires a restart
+        bot_settings.action_dict = ActionRegistry.from_settings(bot_settings)
 
     def parse_message(self, message: discord.message.Message) -> actions.ActionInterface:
         '''Method that parse command and returns the corresponding action'''
@@ -25,23 +43,24 @@ class MessageHandler:
         if not message.content or message.author.bot:
             return None
 
-        # in case of DM to the bot
-        if not message.guild:
-            logging.info('(%s) Author: %s, Message ID: %d', datetime.utcnow(),
-                         message.author.display_name, message.id)
-            logging.warning('Message has no guild. Sending error message back to the author.')
-            return actions.SimpleResponse("Sorry, it's not enough food for me in DM!")
-
         command_character = self.bot_settings.system_settings.command_character
 
         if not message.content.startswith(command_character):
             # The branch that gets called
             # when there is no command character at the start of a message.
-            # Use for tasks that have to check every message.
+            # Tasks that have to check every message are passive listeners, see listeners.py
             return None
 
-        logging.info('(%s) Author: %s, Message ID: %d, Message: %s', datetime.utcnow(),
-                     message.author.display_name, message.id, message.content)
+        # in case of DM to the bot
+        if not message.guild:
+            logging.info('Author: %s, Message ID: %d', message.author.display_name, message.id,
+                         extra=SAMPLED)
+            logging.warning('Message has no guild. Sending error message back to the author.')
+            return actions.SimpleResponse("Sorry, it's not enough food for me in DM!")
+
+        # time is added by the log formatter
+        logging.info('Author: %s, Message ID: %d, Message: %s', message.author.display_name,
+                     message.id, message.content, extra=SAMPLED)
 
         command, arguments = self.extract_command_and_args(message.content)
 
@@ -51,12 +70,27 @@ class MessageHandler:
         if not action:
             return None
 
-        if action not in self.bot_settings.action_dict:
+        # the action module is imported here on the first call
+        action_class = self.bot_settings.action_dict.get(action)
+        if action_class is None:
             logging.error("Action '%s' don't have a corresponding action class!", action)
             return None
 
-        action_class = self.bot_settings.action_dict[action]
-        return action_class(message, arguments, self.bot_settings, action_settings)
+        # some actions are charged later, when they know, that the call isn't answered from cache
+        delay = get_throttle_delay(message.author, action, action_class.cost, action_settings,
+                                   self.bot_settings, self.throttle,
+                                   take=not action_class.charged_in_action)
+        if delay:
+            logging.info("Called action '%s' is throttled for user '%s' for %.0f seconds",
+                         action, message.author.display_name, delay)
+            wait = f'{int(delay // 60) + 1} minute(s)' if delay >= 60 else \
+                f'{int(delay) + 1} second(s)'
+            return actions.SimpleResponse(f"Not so fast, please! "
+                                          f"Try '{command_character}{command}' again in {wait}")
+
+        action_instance = action_class(message, arguments, self.bot_settings, action_settings)
+        action_instance.action_name = action
+        return action_instance
 
     @staticmethod
     def extract_command_and_args(message: str, separator=' ') -> (str, [str]):
@@ -1,16 +1,26 @@
-'''File to describe the interface for action and list of actions'''
-from datetime import timedelta, datetime
-import re
+'''
+File to describe the interface for action and the basic actions.
+Bigger actions live in their own modules, see registry.py
+'''
 import logging
 
-from discord import ChannelType, errors, Embed, Message
+from discord import Embed, Message
 from bot_settings.settings import BotSettings, ActionSettings
-from . import functions, time_utils
+from . import functions
+from .dispatcher import PRIORITY_HIGH, PRIORITY_NORMAL
 
 
 class ActionInterface:
     '''Interface for async action to execute'''
 
+    # priority of the responses in the outbound dispatcher
+    priority = PRIORITY_NORMAL
+    # tokens taken from the user_limit and guild_limit of the action for every call
+    cost = 1
+    # actions, that call charge() themselves once they know the call does the work,
+    # are only checked against the limits, when the message is parsed
+    charged_in_action = False
+
     def __init__(self, message: Message, arguments: [str], bot_settings: BotSettings,
                  action_settings: ActionSettings):
         self.action_message = message
@@ -21,199 +31,64 @@ class ActionInterface:
         # create fields, that will be filled later
         self.response_channel = None
         self.client = None
+        self.handler = None  # message handler, that gives access to the shared bot state
+        self.action_name = None  # name of the action in settings, set by the message handler
 
     async def run_action(self):
         '''Method to run async action'''
         logging.warning('Default run_action method is not overriden!')
 
-# pylint: disable=unused-argument
-    @staticmethod
-    def get_help_message(action_settings: ActionSettings) -> str:
-        '''Returns help message for the action'''
-        return 'No help message'
-
-    @staticmethod
-    def get_detailed_help_message(action_settings: ActionSettings, arguments: [str]) -> str:
-        '''Returns detailed help message for the action'''
-        return 'No detailed help message'
-#pylint: enable=unused-argument
-
-
-class EmojiCounter(ActionInterface):
-    '''Class, that counts emoji usage for a some period of time'''
-
-    @staticmethod
-    def get_help_message(action_settings: ActionSettings) -> str:
-        days_to_count = action_settings.settings['days_to_count']
-        return f'Counts the server emoji used in the last {days_to_count} days.'
+    def charge(self):
+        '''Takes the cost of the call from the limits, see charged_in_action'''
+        throttle = self.handler.throttle if self.handler else None
+        if throttle and self.action_name:
+            functions.charge_throttle(self.action_message.author, self.action_name, self.cost,
+                                      self.action_settings, self.bot_settings, throttle)
 
-    @staticmethod
-    def get_detailed_help_message(action_settings: ActionSettings, arguments: [str]) -> str:
-        return "One perfect day you'll be able to pass amount of days as argument, but not now"
-
-    def __init__(self, message: Message, arguments: [str], bot_settings: BotSettings,
-                 action_settings: ActionSettings):
-        super().__init__(message, arguments, bot_settings, action_settings)
-
-        self.days_to_count = int(self.action_settings.settings['days_to_count'])
-        self.channels = []
-
-        guild_channels = self.action_message.guild.channels
-        for channel in guild_channels:
-            if channel.type == ChannelType.text:  # filter channels by type
-                self.channels.append(channel)
-
-    @staticmethod
-    def get_server_emoji_dict(server):
-        '''returns the dictionary <emoji: 0> with all emojis from the server'''
-        result = dict()
-        for emoji in server.emojis:
-            if not emoji.animated:
-                result[emoji] = 0
-
-        return result
-
-    @staticmethod
-    def count_emoji_in_messages(message, container, bot_id):
-        '''Counts the number of static server emoji in the text of the message and in the reactions.
-           Ignores messages sent by the bot.
+    async def send(self, content=None, priority=None, merge=True, **kwargs) -> Message:
         '''
+        Sends response to the response channel through the outbound dispatcher.
+        Responses with merge=True can be merged with others, so don't edit them later.
+        '''
+        dispatcher = self.handler.dispatcher if self.handler else None
+        if not dispatcher:
+            return await self.response_channel.send(content, **kwargs)
 
-        if not message.author.id == bot_id:
-            message_emoji_pattern = re.compile("(<:?[a-zA-Z0-9]+:?[0-9]+>)")
-            emojis_str = message_emoji_pattern.findall(message.content)
-            for emoji_str in emojis_str:
-                # split -> ['<', 'name', 'id>']
-                emoji_id = emoji_str.split(':')[2][:-1]
-
-                search_container = dict()
-                for k in container.keys():
-                    search_container[k.id] = k
-
-                if int(emoji_id) in search_container.keys():
-                    container[search_container[int(emoji_id)]] += 1
-
-        if message.reactions:
-            for reaction in message.reactions:
-                if reaction.custom_emoji and \
-                        reaction.emoji in container.keys():
-                    container[reaction.emoji] += reaction.count
-
-    async def run_action(self):
-        '''Should be called once per bot request'''
-        if not self.response_channel:# or not self.client:
-            logging.error('No response channel to answer')
-            return
-
-        result = f'Counting emojis for the last {self.days_to_count} day(s), do not disturb...'
-        logging.info(result)
-        result_msg = await self.response_channel.send(result)
-
-        check_time = timedelta(days=self.days_to_count)
-
-        emoji_dict = self.get_server_emoji_dict(self.response_channel.guild)
-        async with self.response_channel.typing():
-            for channel in self.channels:
-                logging.info('Working with %s', channel)
-                try:
-                    await functions.handle_messages(self.client, channel,
-                                                    check_time,
-                                                    self.count_emoji_in_messages,
-                                                    emoji_dict)
-                except errors.Forbidden:
-                    logging.warning("We have no access to %s", channel)
-            logging.info('Finished!')
-            output = f"We found the following emojis in the last {self.days_to_count} day(s):\n"
-            await result_msg.edit(content=output)
-
-        output = ""
-        # To change the sorting order, add reverse=True to the sorted()
-
-        emojis = list(emoji_dict.items())  # [(emoji, amout)]
-        # sort by amount, in increasing order
-        emojis.sort(key=lambda emoji_tuple: emoji_tuple[1], reverse=False)
-
-        for emoji, amount in emojis:
-            line = f"Emoji {emoji} was used {amount} times.\n"
-
-            # Send message, if line will be too long after concat
-            if len(output) + len(line) > self.bot_settings.system_settings.characters_limit:
-                await self.response_channel.send(output)
-                output = ""
-
-            output += line
-
-        # Send what's left after cycle
-        if output:
-            output += 'The end!'
-            await self.response_channel.send(output)
+        if priority is None:
+            priority = self.priority
+        return await dispatcher.send(self.response_channel, content, priority, merge, **kwargs)
 
+    async def run_job(self, job_factory):
+        '''
+        Runs expensive job (coroutine returned by job_factory) through the job scheduler.
+        Calls of the same action with the same arguments in one guild share one run.
+        '''
+        scheduler = self.handler.job_scheduler if self.handler else None
+        if not scheduler:
+            return await job_factory()
 
-class ConvertTime(ActionInterface):
-    '''Action to convert time between timezones'''
+        guild_id = self.action_message.guild.id
+        key = (type(self).__name__, guild_id, tuple(self.action_arguments))
+        return await scheduler.run(key, guild_id, job_factory)
 
+# pylint: disable=unused-argument
     @staticmethod
     def get_help_message(action_settings: ActionSettings) -> str:
-        return "Converts time between timezones. Use '!help convert' for details"
+        '''Returns help message for the action'''
+        return 'No help message'
 
     @staticmethod
     def get_detailed_help_message(action_settings: ActionSettings, arguments: [str]) -> str:
-        return "Use as '!convert time timezone_from timezone_to' " +\
-               "(for example '!convert 9:15 AM CST GMT+3')\n" +\
-               "Time supports both 12h and 24h formats\n" +\
-               "Use abbreviation or UTC offset to specify timezones.\n" +\
-               "Take into account that some timezones are sharing one abbreviation. " +\
-               "It's better to use UTC offset, if you know it"
-
-    async def run_action(self):
-        respond = self.response_channel.send
-        if len(self.action_arguments) < 3:
-            await respond('Not enough arguments.\n'
-                          'Command is used as "!convert time timezone_from timezone_to"')
-            return
-
-        timezone_to = self.action_arguments[-1]
-        timezone_from = self.action_arguments[-2]
-        time = ' '.join(self.action_arguments[0:-2])
-
-        try:
-            time = time_utils.get_datetime_from_strtime(time)
-        except ValueError:
-            await respond(f"Can't parse '{time}' time. Is it valid?")
-            return
-
-        # using current day to avoid problems with dates less than starting one
-        time = datetime.utcnow().replace(hour=time.hour, minute=time.minute)
-
-        try:
-            timezone_from = time_utils.get_timezone_from_abbr(timezone_from)
-        except KeyError as error:
-            await respond(f"Can't find timezone {error}")
-            return
-
-        except ValueError as error:
-            await respond(f"Can't parse '{timezone_from}' timezone. Is it valid?")
-            return
-
-        try:
-            timezone_to = time_utils.get_timezone_from_abbr(timezone_to)
-        except KeyError as error:
-            await respond(f"Can't find timezone {error}")
-            return
-        except ValueError:
-            await respond(f"Can't parse '{timezone_to}' timezone. Is it valid?")
-            return
-
-        time_utc = time - timezone_from.utcoffset(None)
-        result_time = time_utc + timezone_to.utcoffset(None)
-
-        await respond(f'{result_time:%H:%M} (from {timezone_from} to {timezone_to})')
-
+        '''Returns detailed help message for the action'''
+        return 'No detailed help message'
+#pylint: enable=unused-argument
 
 
 class HelpMessage(ActionInterface):
     """Creates and prints the help message"""
 
+    priority = PRIORITY_HIGH
+
     @staticmethod
     def get_help_message(action_settings: ActionSettings) -> str:
         return "Displays this help message."
@@ -228,12 +103,12 @@ class HelpMessage(ActionInterface):
             arguments = self.action_arguments[1:]
             embed = self.make_command_help_message(command, arguments)
             if embed:
-                await self.response_channel.send(content=None, embed=embed)
+                await self.send(embed=embed)
             else:
-                await self.response_channel.send(f"Can't find help for '{command}'")
+                await self.send(f"Can't find help for '{command}'")
         else:
             embed = self.make_general_help_message()
-            await self.response_channel.send(content=None, embed=embed)
+            await self.send(embed=embed)
 
     def make_general_help_message(self) -> Embed:
         '''Creates embeded help message with short help for each command'''
@@ -244,16 +119,21 @@ class HelpMessage(ActionInterface):
                        "All commands are case insensetive")
         embed = Embed(title="Help with FooDBoT commands", description=description)
 
-        for action, action_class in self.bot_settings.action_dict.items():
+        for action in self.bot_settings.action_dict:
             action_setup = self.bot_settings.action_settings[action]
             if not action_setup.is_active:
                 continue
 
-            action_allowed = functions.is_action_allowed(message_author, action_setup,
-                                                         self.bot_settings.system_settings)
+            action_allowed = functions.is_action_allowed(message_author, action,
+                                                         self.bot_settings)
             if not action_allowed:
                 continue
 
+            # only listed actions are imported
+            action_class = self.bot_settings.action_dict.get(action)
+            if action_class is None:
+                continue
+
             keywords = self.get_action_keywords_string(action)
             help_mesage = action_class.get_help_message(action_setup)
 
@@ -271,12 +151,11 @@ class HelpMessage(ActionInterface):
 
         if action is None:
             return None
-        if action not in self.bot_settings.action_dict:
+        action_class = self.bot_settings.action_dict.get(action)
+        if action_class is None:
             logging.warning("Action %s don't have a corresponding action class!", action)
             return None
 
-        action_class = self.bot_settings.action_dict[action]
-
         title = f"Help with '{command}'"
         description = f"{action_class.get_help_message(action_settings)}\n\n" +\
                       f"{action_class.get_detailed_help_message(action_settings, arguments)}"
@@ -299,13 +178,49 @@ class HelpMessage(ActionInterface):
 
         return result
 
+class StatsReport(ActionInterface):
+    """Shows call counts, errors and latencies of actions to admins"""
+
+    @staticmethod
+    def get_help_message(action_settings: ActionSettings) -> str:
+        return "Shows actions usage and latency stats. Available to admins only."
+
+    @staticmethod
+    def get_detailed_help_message(action_settings: ActionSettings, arguments: [str]) -> str:
+        return "Shows calls and errors count of each action with the 50th and 99th " +\
+               "percentiles of parse and execute time since the bot start."
+
+    async def run_action(self):
+        if not functions.is_admin(self.action_message.author, self.bot_settings):
+            await self.send('Sorry, stats are available to admins only')
+            return
+
+        if not self.handler:
+            logging.error('No message handler to take stats from')
+            return
+
+        # leave space for the code block markdown
+        characters_limit = self.bot_settings.system_settings.characters_limit - 8
+        output = ''
+        for line in self.handler.stats.format_report().splitlines():
+            if output and len(output) + len(line) + 1 > characters_limit:
+                await self.send(f'```\n{output}```')
+                output = ''
+            output += line + '\n'
+
+        if output:
+            await self.send(f'```\n{output}```')
+
+
 # pylint: disable=too-few-public-methods
 class SimpleResponse(ActionInterface):
     """Sending a simple response message back to response channel"""
+    priority = PRIORITY_HIGH
+
     def __init__(self, response_message: str):
         super().__init__(None, None, None, None)
         self.response = response_message
 
     async def run_action(self):
-        await self.response_channel.send(self.response)
+        await self.send(self.response)
 # pylint: enable=too-few-public-methods
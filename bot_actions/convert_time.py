@@ -0,0 +1,70 @@
+'''File with the action, that converts time between timezones'''
+from datetime import datetime
+
+from bot_settings.settings import ActionSettings
+from . import time_utils
+from .actions import ActionInterface
+from .dispatcher import PRIORITY_HIGH
+
+
+class ConvertTime(ActionInterface):
+    '''Action to convert time between timezones'''
+
+    priority = PRIORITY_HIGH
+
+    @staticmethod
+    def get_help_message(action_settings: ActionSettings) -> str:
+        return "Converts time between timezones. Use '!help convert' for details"
+
+    @staticmethod
+    def get_detailed_help_message(action_settings: ActionSettings, arguments: [str]) -> str:
+        return "Use as '!convert time timezone_from timezone_to' " +\
+               "(for example '!convert 9:15 AM CST GMT+3')\n" +\
+               "Time supports both 12h and 24h formats\n" +\
+               "Use abbreviation or UTC offset to specify timezones.\n" +\
+               "Take into account that some timezones are sharing one abbreviation. " +\
+               "It's better to use UTC offset, if you know it"
+
+    async def run_action(self):
+        respond = self.send
+        if len(self.action_arguments) < 3:
+            await respond('Not enough arguments.\n'
+                          'Command is used as "!convert time timezone_from timezone_to"')
+            return
+
+        timezone_to = self.action_arguments[-1]
+        timezone_from = self.action_arguments[-2]
+        time = ' '.join(self.action_arguments[0:-2])
+
+        try:
+            time = time_utils.get_datetime_from_strtime(time)
+        except ValueError:
+            await respond(f"Can't parse '{time}' time. Is it valid?")
+            return
+
+        # using current day to avoid problems with dates less than starting one
+        time = datetime.utcnow().replace(hour=time.hour, minute=time.minute)
+
+        try:
+            timezone_from = time_utils.get_timezone_from_abbr(timezone_from)
+        except KeyError as error:
+            await respond(f"Can't find timezone {error}")
+            return
+
+        except ValueError as error:
+            await respond(f"Can't parse '{timezone_from}' timezone. Is it valid?")
+            return
+
+        try:
+            timezone_to = time_utils.get_timezone_from_abbr(timezone_to)
+        except KeyError as error:
+            await respond(f"Can't find timezone {error}")
+            return
+        except ValueError:
+            await respond(f"Can't parse '{timezone_to}' timezone. Is it valid?")
+            return
+
+        time_utc = time - timezone_from.utcoffset(None)
+        result_time = time_utc + timezone_to.utcoffset(None)
+
+        await respond(f'{result_time:%H:%M} (from {timezone_from} to {timezone_to})')
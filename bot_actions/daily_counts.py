@@ -0,0 +1,77 @@
+'''File with the per-day emoji amounts, that can answer any window of days'''
+from array import array
+from datetime import date, datetime, timedelta
+import sys
+
+EPOCH_DAY = date(1970, 1, 1)
+# there are no messages before Discord launch, so no window starts earlier
+DISCORD_EPOCH_DAY = (date(2015, 1, 1) - EPOCH_DAY).days
+SECONDS_PER_DAY = 86400
+
+
+def get_day_number(day: date) -> int:
+    '''Returns number of the UTC day since the epoch'''
+    return (day - EPOCH_DAY).days
+
+
+def get_day_start(day_number: int) -> datetime:
+    '''Returns start of the day by its number as naive UTC datetime'''
+    return datetime(1970, 1, 1) + timedelta(days=day_number)
+
+
+class DailyEmojiCounts:
+    '''
+    Emoji amounts bucketed by UTC days.
+    Every emoji has an array of prefix sums over the days,
+    so total amount of any window is a subtraction of two items per emoji.
+    Arrays start at the first day with data, days before it are known to have no emoji.
+    '''
+
+    def __init__(self, first_day: int, last_day: int, daily_amounts: {str: {int: int}}):
+        '''
+        first_day and last_day are day numbers (inclusive) covered by the counts,
+        daily_amounts is {emoji: {day_number: amount}}
+        '''
+        self.covered_from = first_day
+        self.last_day = last_day
+        data_days = [min(amounts) for amounts in daily_amounts.values() if amounts]
+        self.first_day = max(first_day, min(data_days)) if data_days else last_day
+        self.prefix_sums = dict()
+
+        first_day = self.first_day
+        days = last_day - first_day + 1
+        for emoji, amounts in daily_amounts.items():
+            sums = array('q', bytes(8 * (days + 1)))
+            total = 0
+            for day in range(days):
+                total += amounts.get(first_day + day, 0)
+                sums[day + 1] = total
+            self.prefix_sums[emoji] = sums
+
+    @classmethod
+    def from_rows(cls, first_day: int, last_day: int, rows: [(str, int, int)]):
+        '''Creates counts from (emoji, day_number, amount) rows, rows out of days are ignored'''
+        daily_amounts = dict()
+        for emoji, day, amount in rows:
+            if first_day <= day <= last_day:
+                emoji_amounts = daily_amounts.setdefault(emoji, dict())
+                emoji_amounts[day] = emoji_amounts.get(day, 0) + amount
+        return cls(first_day, last_day, daily_amounts)
+
+    def covers(self, first_day: int, last_day: int) -> bool:
+        '''Checks if all days between first_day and last_day (inclusive) are in the counts'''
+        return self.covered_from <= first_day and last_day <= self.last_day
+
+    def count(self, first_day: int, last_day: int) -> {str: int}:
+        '''Returns {emoji: amount} for days between first_day and last_day (inclusive)'''
+        start = max(first_day, self.first_day) - self.first_day
+        stop = min(last_day, self.last_day) - self.first_day + 1
+        if stop <= start:
+            return dict()
+        return {emoji: sums[stop] - sums[start] for emoji, sums in self.prefix_sums.items()}
+
+    def __sizeof__(self):
+        size = object.__sizeof__(self) + sys.getsizeof(self.prefix_sums)
+        for sums in self.prefix_sums.values():
+            size += sys.getsizeof(sums)
+        return size
@@ -0,0 +1,125 @@
+'''File with the dispatcher of outbound messages, that keeps responses within rate limits'''
+import asyncio
+import heapq
+import itertools
+import logging
+
+from .token_bucket import TokenBucket
+
+# priorities of the responses, the lower goes first
+PRIORITY_HIGH = 0  # short replies, like help
+PRIORITY_NORMAL = 1
+PRIORITY_BULK = 2  # long reports
+
+# discord allows 5 messages per 5 seconds in one channel
+CHANNEL_RATE_LIMIT = 5
+CHANNEL_RATE_PERIOD = 5
+
+
+class OutboundMessage:
+    '''Message waiting to be sent, future gets the sent discord.Message'''
+
+    def __init__(self, content: str, kwargs: dict, merge: bool):
+        self.content = content
+        self.kwargs = kwargs
+        self.merge = merge
+        self.future = asyncio.get_event_loop().create_future()
+
+    def can_merge(self) -> bool:
+        '''Checks if the message is a plain text, that can share a message with others'''
+        return self.merge and not self.kwargs and bool(self.content)
+
+
+class OutboundDispatcher:
+    '''
+    Sends responses through per-channel queues.
+    Every channel has a token bucket, so messages wait in our queue instead of
+    discord.py rate limiter, where high priority replies can't overtake bulk reports.
+    Adjacent plain text messages are merged, while they fit into the characters limit.
+    '''
+
+    def __init__(self, owner):
+        # owner has bot_settings, they can be replaced by the settings watcher
+        self.owner = owner
+        self.queues = dict()  # {channel_id: [(priority, sequence, OutboundMessage)]}
+        self.buckets = dict()  # {channel_id: TokenBucket}
+        self.workers = dict()  # {channel_id: task}
+        self.sequence = itertools.count()
+
+    async def send(self, channel, content=None, priority=PRIORITY_NORMAL, merge=True, **kwargs):
+        '''
+        Queues the message to the channel and returns the sent message.
+        Merged messages return the same discord.Message, so pass merge=False to edit it later.
+        '''
+        message = OutboundMessage(content, kwargs, merge)
+        heapq.heappush(self.queues.setdefault(channel.id, []),
+                       (priority, next(self.sequence), message))
+        if channel.id not in self.workers:
+            self.workers[channel.id] = asyncio.ensure_future(self.drain(channel))
+        return await message.future
+
+    def get_bucket(self, channel_id: int) -> TokenBucket:
+        '''Returns rate limit bucket of the channel'''
+        bucket = self.buckets.get(channel_id)
+        if bucket is None:
+            bucket = TokenBucket(CHANNEL_RATE_LIMIT, CHANNEL_RATE_PERIOD)
+            self.buckets[channel_id] = bucket
+        return bucket
+
+    def pop_batch(self, queue: list) -> [OutboundMessage]:
+        '''Takes the next message from the queue with the following ones, that can be merged'''
+        characters_limit = self.owner.bot_settings.system_settings.characters_limit
+        batch = [heapq.heappop(queue)[2]]
+        if not batch[0].can_merge():
+            return batch
+
+        length = len(batch[0].content)
+        while queue:
+            message = queue[0][2]
+            if not message.can_merge() or length + 1 + len(message.content) > characters_limit:
+                break
+            heapq.heappop(queue)
+            batch.append(message)
+            length += 1 + len(message.content)
+        return batch
+
+    async def drain(self, channel):
+        '''Sends queued messages of the channel, until the queue is empty'''
+        queue = self.queues[channel.id]
+        bucket = self.get_bucket(channel.id)
+        try:
+            while queue:
+                delay = bucket.get_delay()
+                if delay:
+                    # new messages can come while waiting, they will be sorted by priority
+                    await asyncio.sleep(delay)
+                    continue
+
+                batch = [message for message in self.pop_batch(queue)
+                         if not message.future.done()]  # the caller may be cancelled
+                if not batch:
+                    continue
+
+                bucket.take()
+                if len(batch) > 1:
+                    logging.info('Merged %d responses to %s', len(batch), channel)
+                try:
+                    sent = await channel.send('\n'.join(message.content for message in batch)
+                                              if len(batch) > 1 else batch[0].content,
+                                              **batch[0].kwargs)
+                except Exception as error:  # pylint: disable=broad-except
+                    for message in batch:
+                        if not message.future.done():
+                            message.future.set_exception(error)
+                else:
+                    for message in batch:
+                        if not message.future.done():
+                            message.future.set_result(sent)
+        finally:
+            # the worker can be cancelled on shutdown, nobody will send the rest
+            for _, _, message in queue:
+                message.future.cancel()
+            del self.workers[channel.id]
+            del self.queues[channel.id]
+            if bucket.is_full():
+                del self.buckets[channel.id]
@@ -0,0 +1,81 @@
+'''File with the emoji amounts per user or per channel, kept in compact arrays'''
+from array import array
+import heapq
+import sys
+
+# amount of the top users or channels shown for every emoji
+TOP_OWNERS = 3
+
+
+class EmojiBreakdown:
+    '''
+    Emoji amounts split by owner: the author of the message or the channel.
+    Emoji and owners get slots on the first use, every emoji has an array of amounts indexed
+    by owner slot. A pair takes 4 bytes instead of a dict item with two int objects,
+    so memory is bounded by used emoji * active owners even for guilds with 10k+ members.
+    '''
+
+    def __init__(self):
+        self.emoji_slots = dict()  # {emoji key: slot}
+        self.emoji_keys = []
+        self.owner_slots = dict()  # {owner id: slot}
+        self.owner_ids = array('Q')
+        self.amounts = []  # array of amounts by owner slot for every emoji slot
+
+    def add(self, emoji_key: str, owner_id: int, amount=1):
+        '''Adds amount of the emoji (custom emoji id or unicode emoji key) to the owner'''
+        slot = self.emoji_slots.get(emoji_key)
+        if slot is None:
+            slot = len(self.emoji_keys)
+            self.emoji_slots[emoji_key] = slot
+            self.emoji_keys.append(emoji_key)
+            self.amounts.append(array('I'))
+
+        owner_slot = self.owner_slots.get(owner_id)
+        if owner_slot is None:
+            owner_slot = len(self.owner_ids)
+            self.owner_slots[owner_id] = owner_slot
+            self.owner_ids.append(owner_id)
+
+        amounts = self.amounts[slot]
+        if owner_slot >= len(amounts):
+            # arrays grow only to the last owner, that used the emoji
+            amounts.frombytes(bytes(amounts.itemsize * (owner_slot + 1 - len(amounts))))
+        amounts[owner_slot] += amount
+
+    def add_rows(self, rows):
+        '''Adds (emoji key, owner id, amount) rows'''
+        add = self.add
+        for emoji_key, owner_id, amount in rows:
+            add(emoji_key, owner_id, amount)
+
+    def get_totals(self) -> {str: int}:
+        '''Returns {emoji key: amount} of all owners'''
+        return {emoji_key: sum(amounts)
+                for emoji_key, amounts in zip(self.emoji_keys, self.amounts)}
+
+    def get_top(self, emoji_key: str, amount=TOP_OWNERS) -> [(int, int)]:
+        '''Returns (owner id, amount) of the owners, that used the emoji the most'''
+        slot = self.emoji_slots.get(emoji_key)
+        if slot is None:
+            return []
+        amounts = self.amounts[slot]
+        top = heapq.nlargest(amount, range(len(amounts)), key=amounts.__getitem__)
+        return [(self.owner_ids[owner_slot], amounts[owner_slot])
+                for owner_slot in top if amounts[owner_slot]]
+
+    def iterate_pairs(self):
+        '''Yields (emoji key, owner id, amount) for every used pair'''
+        owner_ids = self.owner_ids
+        for emoji_key, amounts in zip(self.emoji_keys, self.amounts):
+            for owner_slot, amount in enumerate(amounts):
+                if amount:
+                    yield emoji_key, owner_ids[owner_slot], amount
+
+    def __sizeof__(self):
+        size = (object.__sizeof__(self) + sys.getsizeof(self.emoji_slots)
+                + sys.getsizeof(self.emoji_keys) + sys.getsizeof(self.owner_slots)
+                + sys.getsizeof(self.owner_ids) + sys.getsizeof(self.amounts))
+        for amounts in self.amounts:
+            size += sys.getsizeof(amounts)
+        return size
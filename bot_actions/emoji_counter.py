@@ -0,0 +1,407 @@
+'''File with the action, that counts emoji usage'''
+from datetime import datetime
+import asyncio
+import json
+import logging
+import time
+
+from discord import ChannelType, errors, Emoji, Message, Object
+from bot_settings.log_config import SAMPLED
+from bot_settings.settings import BotSettings, ActionSettings
+from . import functions
+from .actions import ActionInterface
+from .daily_counts import DISCORD_EPOCH_DAY, DailyEmojiCounts, get_day_number, get_day_start
+from .dispatcher import PRIORITY_BULK
+from .emoji_breakdown import EmojiBreakdown
+from .emoji_extractor import EmojiExtractor, extract_emoji_keys, get_reaction_key, is_unicode_key
+from .report_renderer import RenderedReport, make_embed, make_file, render_breakdown_report, \
+    render_emoji_report
+
+# arguments to split the amounts, like '!CountEmoji 30 by user'
+BREAKDOWNS = {'user': 'user', 'users': 'user', 'channel': 'channel', 'channels': 'channel'}
+
+
+class EmojiCounter(ActionInterface):
+    '''Class, that counts emoji usage for a some period of time'''
+
+    # scans can take hundreds of history requests
+    cost = 10
+    # cached results, calls joining a running count and wrong arguments are free
+    charged_in_action = True
+
+    @staticmethod
+    def get_help_message(action_settings: ActionSettings) -> str:
+        days_to_count = action_settings.settings['days_to_count']
+        return f'Counts the server emoji used in the last {days_to_count} days.'
+
+    @staticmethod
+    def get_detailed_help_message(action_settings: ActionSettings, arguments: [str]) -> str:
+        return "Pass amount of days to count, like '!CountEmoji 30', " +\
+               "or dates in YYYY-MM-DD format, like '!CountEmoji 2026-09-01 2026-09-15'.\n" +\
+               "Days are counted in UTC, today is included.\n" +\
+               "Add 'by user' or 'by channel' to see who uses every emoji and where, " +\
+               "reactions are counted only by channel.\n" +\
+               "Results are reused for a while, admins can use 'refresh' argument to recount"
+
+    def __init__(self, message: Message, arguments: [str], bot_settings: BotSettings,
+                 action_settings: ActionSettings):
+        super().__init__(message, arguments, bot_settings, action_settings)
+
+        self.days_to_count = int(self.action_settings.settings['days_to_count'])
+        self.max_window_days = int(self.action_settings.settings.get('max_window_days', 366))
+        # window of UTC days to count (inclusive), set by parse_window
+        self.first_day = None
+        self.last_day = None
+        self.window_error = None
+        # age in seconds of the index data used by the count, see get_daily_counts
+        self.data_age = 0
+        scan_concurrency = self.action_settings.settings.get('scan_concurrency', 10)
+        self.scan_concurrency = max(1, int(scan_concurrency))
+        self.result_cache_ttl = int(self.action_settings.settings.get('result_cache_ttl', 600))
+        count_unicode = self.action_settings.settings.get('count_unicode_emoji', True)
+        self.count_unicode = json.loads(str(count_unicode).lower())
+        arguments = [argument.lower() for argument in arguments if argument]
+        self.refresh_requested = 'refresh' in arguments
+        arguments = [argument for argument in arguments if argument != 'refresh']
+        self.breakdown = None  # 'user' or 'channel'
+        arguments = self.parse_breakdown(arguments)
+        self.parse_window(arguments)
+        self.channels = []
+
+        guild_channels = self.action_message.guild.channels
+        for channel in guild_channels:
+            if channel.type == ChannelType.text:  # filter channels by type
+                self.channels.append(channel)
+
+    def parse_breakdown(self, arguments: [str]) -> [str]:
+        '''Sets breakdown from the 'by user' or 'by channel' arguments, returns the rest'''
+        if 'by' not in arguments:
+            return arguments
+        index = arguments.index('by')
+        breakdown = arguments[index + 1] if index + 1 < len(arguments) else None
+        if breakdown not in BREAKDOWNS:
+            self.window_error = "Use 'by user' or 'by channel'"
+            return arguments[:index]
+        self.breakdown = BREAKDOWNS[breakdown]
+        return arguments[:index] + arguments[index + 2:]
+
+    def parse_window(self, arguments: [str]):
+        '''
+        Sets the window of days to count from arguments: nothing, amount of days,
+        one date (from that date till today) or two dates.
+        In case of wrong arguments or too long window window_error is set.
+        '''
+        today = get_day_number(datetime.utcnow().date())
+        self.first_day = today - self.days_to_count + 1
+        self.last_day = today
+        try:
+            if len(arguments) == 1 and arguments[0].isdigit():
+                days = int(arguments[0])
+                if days < 1:
+                    raise ValueError('Amount of days should be positive')
+                self.first_day = today - days + 1
+            elif len(arguments) in (1, 2):
+                days = [get_day_number(datetime.strptime(argument, '%Y-%m-%d').date())
+                        for argument in arguments]
+                self.first_day = days[0]
+                self.last_day = min(days[-1], today)
+                if self.first_day > self.last_day:
+                    raise ValueError('The first date is after the last one')
+            elif arguments:
+                raise ValueError('Too many arguments')
+            if self.first_day < DISCORD_EPOCH_DAY:
+                raise ValueError('There are no messages before 2015-01-01')
+            if self.last_day - self.first_day + 1 > self.max_window_days:
+                raise ValueError(f'The window is longer than {self.max_window_days} days')
+        except ValueError as error:
+            self.window_error = self.window_error or str(error)
+
+    def get_window_description(self) -> str:
+        '''Returns human-readable description of the counted days'''
+        today = get_day_number(datetime.utcnow().date())
+        if self.last_day == today:
+            return f'in the last {self.last_day - self.first_day + 1} day(s)'
+        first_date = get_day_start(self.first_day)
+        last_date = get_day_start(self.last_day)
+        return f'from {first_date:%Y-%m-%d} to {last_date:%Y-%m-%d}'
+
+    def get_window_bounds(self) -> (datetime, datetime):
+        '''Returns start and stop time of the window'''
+        start = get_day_start(self.first_day)
+        stop = min(get_day_start(self.last_day + 1), datetime.utcnow())
+        return start, stop
+
+    @staticmethod
+    def get_server_emoji_dict(server):
+        '''returns the dictionary <emoji: 0> with all emojis from the server, including animated'''
+        return {emoji: 0 for emoji in server.emojis}
+
+    @staticmethod
+    def count_emoji_in_messages(message, container, bot_id):
+        '''Counts the number of server and unicode emoji in the text of the message and in the
+           reactions. Ignores messages sent by the bot.
+           Container is the EmojiExtractor, that was created with the same bot_id.
+        '''
+        container.count_message(message)
+
+    async def scan_channels(self, scan_channel):
+        '''
+        Runs scan_channel coroutine for every channel.
+        Up to scan_concurrency channels are scanned at once.
+        '''
+        semaphore = asyncio.Semaphore(self.scan_concurrency)
+
+        async def scan(channel):
+            async with semaphore:
+                logging.info('Working with %s', channel, extra=SAMPLED)
+                try:
+                    await scan_channel(channel)
+                except errors.Forbidden:
+                    logging.warning("We have no access to %s", channel)
+
+        await asyncio.gather(*[scan(channel) for channel in self.channels])
+
+    async def count_emoji_in_history(self, container):
+        '''Counts emoji by scanning the history of every channel'''
+        extractor = EmojiExtractor(container.keys(), self.client.user.id, self.count_unicode)
+        start, stop = self.get_window_bounds()
+
+        async def scan_channel(channel):
+            await functions.handle_messages(self.client, channel, stop - start,
+                                            self.count_emoji_in_messages, extractor, stop)
+
+        await self.scan_channels(scan_channel)
+        container.update(extractor.get_amounts())
+
+    async def update_index(self, emoji_index) -> int:
+        '''
+        Scans the history of the window, that is not indexed yet, returns amount of pages.
+        Scan progress is saved after every page, so interrupted scan continues from there.
+        '''
+        start, stop = self.get_window_bounds()
+        bot_id = self.client.user.id
+        scanned_pages = 0
+
+        async def scan_channel(channel):
+            nonlocal scanned_pages
+            covered_from, covered_to = await emoji_index.run(emoji_index.prepare_coverage,
+                                                             channel.id, channel.guild.id,
+                                                             start, stop)
+            # newer messages, from the checkpoint to the window end
+            if covered_to < stop and not emoji_index.is_live(covered_to):
+                logging.info('Indexing %s from %s to %s', channel, covered_to, stop)
+                checkpoint = await emoji_index.run(emoji_index.get_checkpoint, channel.id,
+                                                   covered_to)
+                after = Object(id=checkpoint) if checkpoint else covered_to
+                async for page in functions.iterate_pages(channel, after, stop, True):
+                    await emoji_index.run(emoji_index.add_history_page, channel.id, page, bot_id,
+                                          True)
+                    scanned_pages += 1
+                await emoji_index.run(emoji_index.extend_coverage, channel.id, None, stop)
+
+            # older messages, from the checkpoint back to the window start
+            if start < covered_from:
+                logging.info('Indexing %s from %s to %s', channel, start, covered_from)
+                async for page in functions.iterate_pages(channel, start, covered_from, False):
+                    await emoji_index.run(emoji_index.add_history_page, channel.id, page, bot_id,
+                                          False)
+                    scanned_pages += 1
+                await emoji_index.run(emoji_index.extend_coverage, channel.id, start)
+
+        await self.scan_channels(scan_channel)
+        return scanned_pages
+
+    async def count_emoji_with_index(self, emoji_index, container):
+        '''Counts emoji using the emoji index'''
+        await self.update_index(emoji_index)
+        daily_counts = await self.get_daily_counts(emoji_index)
+        amounts = daily_counts.count(self.first_day, self.last_day)
+        for emoji in container:
+            container[emoji] = amounts.get(str(emoji.id), 0)
+        if self.count_unicode:
+            container.update((key, amount) for key, amount in amounts.items()
+                             if amount and is_unicode_key(key))
+
+    async def get_daily_counts(self, emoji_index) -> DailyEmojiCounts:
+        '''
+        Returns daily counts of the guild from the index and sets data_age.
+        They are kept in the result cache with the index version of the guild, so other windows
+        are answered without the index, until the guild data changes or the cache expires.
+        '''
+        guild_id = self.response_channel.guild.id
+        cache = self.handler.result_cache
+        key = ('DailyEmojiCounts', guild_id)
+
+        version = await emoji_index.run(emoji_index.get_version, guild_id)
+        cached = cache.get(key, self.result_cache_ttl) if cache else None
+        if cached:
+            (daily_counts, cached_version), age = cached
+            if cached_version == version and daily_counts.covers(self.first_day, self.last_day):
+                self.data_age = age
+                return daily_counts
+
+        today = get_day_number(datetime.utcnow().date())
+        first_day = min(self.first_day,
+                        await emoji_index.run(emoji_index.get_first_day, guild_id) or today)
+        rows = await emoji_index.run(emoji_index.get_daily_rows, guild_id, first_day)
+        daily_counts = DailyEmojiCounts.from_rows(first_day, today, rows)
+        if cache:
+            cache.put(key, (daily_counts, version))
+        self.data_age = 0
+        return daily_counts
+
+    async def count_emoji(self) -> [(Emoji, int)]:
+        '''Counts server emoji and returns them sorted by amount, in increasing order'''
+        emoji_dict = self.get_server_emoji_dict(self.response_channel.guild)
+        emoji_index = self.handler.emoji_index if self.handler else None
+        if emoji_index:
+            await self.count_emoji_with_index(emoji_index, emoji_dict)
+        else:
+            await self.count_emoji_in_history(emoji_dict)
+        logging.info('Finished!')
+
+        # To change the sorting order, add reverse=True to the sort()
+        emojis = list(emoji_dict.items())  # [(emoji, amout)]
+        # sort by amount, in increasing order
+        emojis.sort(key=lambda emoji_tuple: emoji_tuple[1], reverse=False)
+        return emojis
+
+    def is_counted(self, emoji_key: str, emoji_ids) -> bool:
+        '''Checks if the emoji is a server emoji or an unicode one, if they are counted'''
+        return self.count_unicode if is_unicode_key(emoji_key) else emoji_key in emoji_ids
+
+    async def count_breakdown_in_history(self, breakdown: EmojiBreakdown, emoji_ids):
+        '''Counts emoji by user or by channel, scanning the history of every channel'''
+        by_user = self.breakdown == 'user'
+        is_counted = self.is_counted
+
+        def count_message(message, container, bot_id):
+            owner_id = message.author.id if by_user else message.channel.id
+            if message.author.id != bot_id:
+                for emoji_key in extract_emoji_keys(message.content):
+                    if is_counted(emoji_key, emoji_ids):
+                        container.add(emoji_key, owner_id)
+            if by_user:
+                return  # we don't know who reacted
+            for reaction in message.reactions:
+                emoji_key = get_reaction_key(reaction.emoji)
+                if is_counted(emoji_key, emoji_ids):
+                    container.add(emoji_key, owner_id, reaction.count)
+
+        start, stop = self.get_window_bounds()
+
+        async def scan_channel(channel):
+            await functions.handle_messages(self.client, channel, stop - start,
+                                            count_message, breakdown, stop)
+
+        await self.scan_channels(scan_channel)
+
+    async def count_breakdown(self) -> EmojiBreakdown:
+        '''Counts server emoji by user or by channel'''
+        guild = self.response_channel.guild
+        emoji_ids = frozenset(str(emoji.id) for emoji in guild.emojis)
+        breakdown = EmojiBreakdown()
+        emoji_index = self.handler.emoji_index if self.handler else None
+        if emoji_index:
+            await self.update_index(emoji_index)
+            start, stop = self.get_window_bounds()
+            rows = await emoji_index.run(emoji_index.count_emoji_by, guild.id, start, stop,
+                                         self.breakdown == 'channel')
+            breakdown.add_rows(row for row in rows if self.is_counted(row[0], emoji_ids))
+        else:
+            await self.count_breakdown_in_history(breakdown, emoji_ids)
+        logging.info('Finished!')
+        return breakdown
+
+    async def count_and_render(self) -> (RenderedReport, float):
+        '''
+        Counts emoji and renders the report, so callers sharing the job share the rendering.
+        Returns the report and the time of the oldest data it's made of.
+        '''
+        self.charge()
+        started_at = time.time()
+        if not self.breakdown:
+            report = render_emoji_report(await self.count_emoji())
+            return report, started_at - self.data_age
+
+        breakdown = await self.count_breakdown()
+        emoji_by_key = {str(emoji.id): emoji for emoji in self.response_channel.guild.emojis}
+        # sort by amount, in increasing order, like the total report
+        totals = sorted(breakdown.get_totals().items(), key=lambda item: item[1])
+        emojis = [(emoji_by_key.get(key, key), amount, breakdown.get_top(key))
+                  for key, amount in totals]
+        report = render_breakdown_report(
+            emojis, self.breakdown == 'channel',
+            lambda: [(emoji_by_key.get(key, key), owner_id, amount)
+                     for key, owner_id, amount in breakdown.iterate_pairs()])
+        return report, started_at
+
+    async def get_emoji_report(self) -> (RenderedReport, float):
+        '''
+        Returns rendered report and age of the counted data in seconds.
+        Reuses cached result, unless admin requested a refresh.
+        '''
+        cache = self.handler.result_cache if self.handler else None
+        if not cache:
+            report, counted_at = await self.run_job(self.count_and_render)
+            return report, max(0, time.time() - counted_at)
+
+        guild = self.response_channel.guild
+        key = (guild.id, self.first_day, self.last_day, self.breakdown,
+               frozenset(emoji.id for emoji in guild.emojis))
+        if self.refresh_requested:
+            if functions.is_admin(self.action_message.author, self.bot_settings):
+                cache.invalidate(key)
+                cache.invalidate(('DailyEmojiCounts', guild.id))
+            else:
+                logging.info('Refresh of emoji count is allowed to admins only')
+
+        cached = cache.get(key, self.result_cache_ttl)
+        if cached:
+            report, counted_at = cached[0]
+        else:
+            report, counted_at = await self.run_job(self.count_and_render)
+            cache.put(key, (report, counted_at))
+        return report, max(0, time.time() - counted_at)
+
+    async def run_action(self):
+        '''Should be called once per bot request'''
+        if not self.response_channel:# or not self.client:
+            logging.error('No response channel to answer')
+            return
+
+        if self.window_error:
+            await self.send(f"Can't understand what days to count: "
+                            f"{self.window_error}. Use '!help CountEmoji'")
+            return
+
+        window = self.get_window_description()
+        result = f'Counting emojis {window}, do not disturb...'
+        logging.info(result)
+        # the message is edited later, so it shouldn't be merged with others
+        result_msg = await self.send(result, merge=False)
+
+        async with self.response_channel.typing():
+            report, age = await self.get_emoji_report()
+            output = f"We found the following emojis {window}"
+            if self.breakdown:
+                output += f" by {self.breakdown}"
+            if age >= 60:
+                output += f" (counted {int(age // 60)} minute(s) ago)"
+            elif age >= 1:
+                output += f" (counted {int(age)} second(s) ago)"
+            output += ":\n"
+
+        if report.csv:
+            await result_msg.edit(content=output)
+            await self.send("There are too many emojis for the chat, "
+                            "here is the file with all of them",
+                            PRIORITY_BULK, file=make_file(report))
+            return
+
+        # the first page goes into the "Counting..." message, so usually nothing else is sent
+        pages = report.pages
+        await result_msg.edit(content=output,
+                              embed=make_embed(pages[0], len(pages) == 1) if pages else None)
+        for index, page in enumerate(pages[1:], 2):
+            await self.send(priority=PRIORITY_BULK, embed=make_embed(page, index == len(pages)))
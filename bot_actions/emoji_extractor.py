@@ -0,0 +1,157 @@
+'''File with the emoji extractor, that counts custom and unicode emoji in messages'''
+import re
+from collections import Counter
+
+# Unicode emoji sequences (https://unicode.org/reports/tr51/) are described by their grammar,
+# so the pattern doesn't grow with the amount of emoji and new emoji are matched too.
+# pictographs, that are shown as emoji by default
+_PRESENTATION = ('⌚⌛⏩-⏬⏰⏳◽◾☔☕♈-♓'
+                 '♿⚓⚡⚪⚫⚽⚾⛄⛅⛎⛔⛪'
+                 '⛲⛳⛵⛺⛽✅✊✋✨❌❎'
+                 '❓-❕❗➕-➗➰➿⬛⬜⭐⭕'
+                 '\U0001f004\U0001f0cf\U0001f18e\U0001f191-\U0001f19a\U0001f201\U0001f21a'
+                 '\U0001f22f\U0001f232-\U0001f236\U0001f238-\U0001f23a\U0001f250\U0001f251'
+                 '\U0001f300-\U0001f64f\U0001f680-\U0001f6ff\U0001f7e0-\U0001f7eb'
+                 '\U0001f900-\U0001f9ff\U0001fa70-\U0001faff')
+# pictographs, that are shown as text, unless followed by the emoji variation selector
+_TEXT = ('©®‼⁉™ℹ↔-↙↩↪⌨⏏'
+         '⏭-⏯⏱⏲⏸-⏺Ⓜ▪▫▶◀◻◼'
+         '☀-☄☎☑☘☝☠☢☣☦☪☮☯'
+         '☸-☺♀♂♟♠♣♥♦♨♻♾⚒'
+         '⚔-⚗⚙⚛⚜⚠⚧⚰⚱⛈⛏⛑⛓'
+         '⛩⛰⛱⛴⛷-⛹✂✈✉✌✍✏✒'
+         '✔✖✝✡✳✴❄❇❣❤➡⤴⤵'
+         '⬅-⬇〰〽㊗㊙\U0001f170\U0001f171\U0001f17e\U0001f17f'
+         '\U0001f202\U0001f237')
+_MODIFIER = '[\U0001f3fb-\U0001f3ff]'  # skin tones
+_ELEMENT = (f'(?:[{_PRESENTATION}]\ufe0f?{_MODIFIER}?'
+            f'|[{_TEXT}](?:\ufe0f{_MODIFIER}?|{_MODIFIER}))')
+# element after the zero width joiner can skip the variation selector
+_JOINED = f'[{_PRESENTATION}{_TEXT}]\ufe0f?{_MODIFIER}?'
+_TAGS = '[\U000e0020-\U000e007e]+\U000e007f'  # subdivision flags, like England
+UNICODE_EMOJI = (f'[\U0001f1e6-\U0001f1ff]{{2}}'  # flags are pairs of regional indicators
+                 f'|[0-9#*]\ufe0f?\u20e3'  # keycaps
+                 f'|{_ELEMENT}(?:{_TAGS})?(?:\u200d{_JOINED})*')
+
+# static <:name:id> and animated <a:name:id> custom emoji, group is the emoji id
+_CUSTOM_EMOJI = '<a?:[a-zA-Z0-9_]+:([0-9]+)>'
+CUSTOM_EMOJI_PATTERN = re.compile(_CUSTOM_EMOJI)
+# custom emoji id in the first group or an unicode emoji sequence in the second one
+EMOJI_PATTERN = re.compile(f'{_CUSTOM_EMOJI}|({UNICODE_EMOJI})')
+VARIATION_SELECTOR = '\ufe0f'
+
+
+def is_ascii(text: str) -> bool:
+    '''
+    Checks if the text has only ASCII characters (str.isascii needs python 3.7).
+    Unicode emoji are never ASCII, so most of the messages need only the custom emoji pattern.
+    '''
+    return len(text.encode('utf-8', 'surrogatepass')) == len(text)
+
+
+def find_emoji(content: str) -> [(str, str)]:
+    '''Returns (custom emoji id, unicode emoji sequence) for every emoji, one of them is empty'''
+    if is_ascii(content):
+        return [(emoji_id, '') for emoji_id in CUSTOM_EMOJI_PATTERN.findall(content)]
+    return EMOJI_PATTERN.findall(content)
+
+
+def get_unicode_key(sequence: str) -> str:
+    '''Returns key of the unicode emoji, the same for the text and emoji presentations'''
+    if VARIATION_SELECTOR in sequence:
+        return sequence.replace(VARIATION_SELECTOR, '')
+    return sequence
+
+
+def get_reaction_key(emoji) -> str:
+    '''
+    Returns key of the reaction emoji: id of the custom emoji or the unicode emoji key.
+    Works with Emoji, PartialEmoji and strings.
+    '''
+    if isinstance(emoji, str):
+        return get_unicode_key(emoji)
+    if emoji.id:
+        return str(emoji.id)
+    return get_unicode_key(emoji.name)
+
+
+def extract_emoji_keys(content: str) -> [str]:
+    '''Returns keys of all emoji in the text: custom emoji ids and unicode emoji keys'''
+    return [emoji_id or get_unicode_key(sequence) for emoji_id, sequence in find_emoji(content)]
+
+
+def is_unicode_key(key: str) -> bool:
+    '''Checks if the emoji key is an unicode emoji, as custom emoji keys are ids'''
+    return not key.isdigit()
+
+
+class EmojiExtractor:
+    '''
+    Counts server emoji (static and animated) and unicode emoji in the text and reactions
+    of messages. Every message text is scanned once by the single pattern, found emoji are
+    looked up by id, so the speed doesn't depend on the amount of server emoji.
+    ASCII texts can't have unicode emoji, they are scanned by the simpler custom emoji pattern.
+    Emoji lookup is built once, so the extractor should be reused for the whole run.
+    Text of the messages sent by the bot is ignored.
+    '''
+
+    def __init__(self, emojis, bot_id=None, count_unicode=True):
+        # ids are kept as strings to avoid converting every match
+        self.emoji_by_id = {str(emoji.id): emoji for emoji in emojis}
+        self.bot_id = bot_id
+        self.count_unicode = count_unicode
+        self.counter = Counter()
+
+    def count_message(self, message):
+        '''Counts emoji in one message'''
+        emoji_by_id = self.emoji_by_id
+        counter = self.counter
+
+        content = message.content
+        if message.author.id != self.bot_id:
+            # the same as is_ascii, inlined as it's called for every message
+            if len(content.encode('utf-8', 'surrogatepass')) == len(content):
+                for emoji_id in CUSTOM_EMOJI_PATTERN.findall(content):
+                    emoji = emoji_by_id.get(emoji_id)
+                    if emoji is not None:
+                        counter[emoji] += 1
+            else:
+                self.count_text(content)
+
+        for reaction in message.reactions:
+            if reaction.custom_emoji:
+                emoji = emoji_by_id.get(str(reaction.emoji.id))
+                if emoji is not None:
+                    counter[emoji] += reaction.count
+            elif self.count_unicode:
+                counter[get_reaction_key(reaction.emoji)] += reaction.count
+
+    def count_text(self, content: str):
+        '''Counts custom and unicode emoji in the text, that is not ASCII'''
+        emoji_by_id = self.emoji_by_id
+        counter = self.counter
+        for emoji_id, sequence in EMOJI_PATTERN.findall(content):
+            if emoji_id:
+                emoji = emoji_by_id.get(emoji_id)
+                if emoji is not None:
+                    counter[emoji] += 1
+            elif self.count_unicode:
+                counter[get_unicode_key(sequence)] += 1
+
+    def count_messages(self, messages):
+        '''Counts emoji in the list of messages'''
+        count_message = self.count_message
+        for message in messages:
+            count_message(message)
+
+    def get_amounts(self) -> dict:
+        '''
+        Returns the dictionary <emoji: amount> with all server emojis, including unused ones,
+        and the used unicode emoji (as strings)
+        '''
+        amounts = {emoji: self.counter[emoji] for emoji in self.emoji_by_id.values()}
+        if self.count_unicode:
+            for emoji, amount in self.counter.items():
+                if isinstance(emoji, str):
+                    amounts[emoji] = amount
+        return amounts
@@ -0,0 +1,427 @@
+'''File with the on-disk emoji usage index, kept up to date by gateway events'''
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import logging
+import sqlite3
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+
+from discord.utils import snowflake_time
+from .daily_counts import SECONDS_PER_DAY
+from .emoji_extractor import extract_emoji_keys, get_reaction_key
+
+# version of the indexed data, older index files are rescanned
+INDEX_VERSION = 1
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS text_usage (
+    message_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    author_id INTEGER,
+    emoji TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (message_id, emoji)
+);
+CREATE TABLE IF NOT EXISTS reaction_usage (
+    message_id INTEGER NOT NULL,
+    channel_id INTEGER NOT NULL,
+    guild_id INTEGER NOT NULL,
+    emoji TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    amount INTEGER NOT NULL,
+    PRIMARY KEY (message_id, emoji)
+);
+CREATE TABLE IF NOT EXISTS coverage (
+    channel_id INTEGER PRIMARY KEY,
+    guild_id INTEGER NOT NULL,
+    covered_from REAL NOT NULL,
+    covered_to REAL NOT NULL,
+    last_message_id INTEGER
+);
+CREATE INDEX IF NOT EXISTS text_usage_time ON text_usage (guild_id, created_at);
+CREATE INDEX IF NOT EXISTS reaction_usage_time ON reaction_usage (guild_id, created_at);
+'''
+
+
+def to_timestamp(time: datetime) -> float:
+    '''converts naive UTC datetime (as discord.py returns it) to the POSIX timestamp'''
+    return time.replace(tzinfo=timezone.utc).timestamp()
+
+
+def from_timestamp(timestamp: float) -> datetime:
+    '''converts POSIX timestamp to the naive UTC datetime'''
+    return datetime.utcfromtimestamp(timestamp)
+
+
+class EmojiIndex:
+    '''
+    Stores emoji usage per message in a local SQLite file.
+    Live events keep the index up to date while the bot is connected,
+    coverage table tells which part of the channel history is already indexed.
+    Methods are blocking, the bot calls them through run, so they are executed one by one
+    in the index thread and waiting for the file lock never blocks the event loop.
+    '''
+
+    def __init__(self, path: str):
+        self.path = path
+        # the file can be shared by several shard processes, so writers wait for each other
+        # the connection is created here, but used only by the index thread after that
+        self.connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.executescript(SCHEMA)
+        self.migrate()
+        self.connection.commit()
+        # start of the current gateway session, None if the bot is not listening to events
+        self.listening_since = None
+        # end of the last session, resumed session continues from it
+        self.ended_at = None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='emoji-index')
+        # {guild_id: amount of commits, that changed emoji usage of the guild}, see get_version
+        self.data_versions = Counter()
+
+    async def run(self, method, *args):
+        '''Runs the index method in the index thread and returns its result'''
+        return await asyncio.get_event_loop().run_in_executor(self.executor, method, *args)
+
+    def close(self):
+        '''closes connection to the index file, after the queued calls are finished'''
+        self.executor.shutdown()
+        self.connection.close()
+
+    def commit_data(self, guild_ids):
+        '''Commits changes of emoji usage, so results of the guilds counted before are outdated'''
+        self.connection.commit()
+        for guild_id in guild_ids:
+            if guild_id is not None:
+                self.data_versions[guild_id] += 1
+
+    def get_version(self, guild_id: int) -> int:
+        '''
+        Returns version of the indexed data of the guild, it changes after every write to it.
+        Guilds are split between shard processes, so others never write the guilds of this one.
+        '''
+        return self.data_versions[guild_id]
+
+    def migrate(self):
+        '''Updates index files created by the older versions of the bot'''
+        columns = [row[1] for row in self.connection.execute('PRAGMA table_info(coverage)')]
+        if 'last_message_id' not in columns:
+            self.connection.execute('ALTER TABLE coverage ADD COLUMN last_message_id INTEGER')
+
+        version = self.connection.execute('PRAGMA user_version').fetchone()[0]
+        if version < INDEX_VERSION:
+            # animated and unicode emoji weren't indexed before, so the history is scanned again
+            self.connection.execute('DELETE FROM coverage')
+            self.connection.execute(f'PRAGMA user_version = {INDEX_VERSION}')
+
+    def start_session(self, resumed=False):
+        '''
+        Should be called when the bot starts receiving events.
+        Resumed gateway session gets the events missed since the disconnect,
+        so channels followed live before it are still followed.
+        '''
+        if resumed and self.listening_since is not None:
+            return
+        if resumed and self.ended_at is not None:
+            self.listening_since = self.ended_at
+        else:
+            self.listening_since = to_timestamp(datetime.utcnow())
+
+    def end_session(self, guild_ids=None):
+        '''
+        Should be called when the bot stops receiving events.
+        Channels that were followed live are marked as covered till now.
+        guild_ids limits it to the guilds of this shard, other shards may be offline.
+        '''
+        if self.listening_since is None:
+            return
+        now = to_timestamp(datetime.utcnow())
+        if guild_ids is None:
+            self.connection.execute('UPDATE coverage SET covered_to = ? WHERE covered_to >= ?',
+                                    (now, self.listening_since))
+        else:
+            self.connection.executemany('UPDATE coverage SET covered_to = ? '
+                                        'WHERE covered_to >= ? AND guild_id = ?',
+                                        [(now, self.listening_since, guild_id)
+                                         for guild_id in guild_ids])
+        self.connection.commit()
+        self.listening_since = None
+        self.ended_at = now
+
+    # Writing to the index
+
+    def add_messages(self, messages, bot_id=None):
+        '''Adds messages to the index in one transaction, messages without guild are skipped'''
+        guild_ids = set()
+        for message in messages:
+            if message.guild:
+                self._add_message(message, bot_id)
+                guild_ids.add(message.guild.id)
+        self.commit_data(guild_ids)
+
+    def _add_message(self, message, bot_id):
+        created_at = to_timestamp(message.created_at)
+        guild_id = message.guild.id
+        channel_id = message.channel.id
+
+        self._delete_rows('text_usage', message.id)
+        if message.author.id != bot_id:
+            self._insert_text(message.id, channel_id, guild_id, message.author.id,
+                              message.content, created_at)
+
+        self._delete_rows('reaction_usage', message.id)
+        rows = []
+        for reaction in message.reactions:
+            rows.append((message.id, channel_id, guild_id, get_reaction_key(reaction.emoji),
+                         created_at, reaction.count))
+        self.connection.executemany('INSERT OR REPLACE INTO reaction_usage '
+                                    'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def update_message_text(self, payload, bot_id=None):
+        '''Updates the index from on_raw_message_edit payload'''
+        data = payload.data
+        if 'content' not in data or 'guild_id' not in data:
+            return  # embed-only update or a DM
+        author_id = int(data['author']['id']) if 'author' in data else None
+        self._delete_rows('text_usage', payload.message_id)
+        if author_id != bot_id:
+            created_at = to_timestamp(snowflake_time(payload.message_id))
+            self._insert_text(payload.message_id, int(data['channel_id']), int(data['guild_id']),
+                              author_id, data['content'], created_at)
+        self.commit_data([int(data['guild_id'])])
+
+    def remove_messages(self, message_ids, guild_id=None):
+        '''Removes deleted messages of the guild from the index'''
+        for message_id in message_ids:
+            self._delete_rows('text_usage', message_id)
+            self._delete_rows('reaction_usage', message_id)
+        self.commit_data([guild_id])
+
+    def add_reaction(self, payload, amount=1):
+        '''Updates the index from on_raw_reaction_add/on_raw_reaction_remove payload'''
+        if not payload.guild_id:
+            return  # DM
+        emoji = get_reaction_key(payload.emoji)
+        created_at = to_timestamp(snowflake_time(payload.message_id))
+        self.connection.execute('INSERT OR IGNORE INTO reaction_usage VALUES (?, ?, ?, ?, ?, 0)',
+                                (payload.message_id, payload.channel_id, payload.guild_id,
+                                 emoji, created_at))
+        self.connection.execute('UPDATE reaction_usage SET amount = amount + ? '
+                                'WHERE message_id = ? AND emoji = ?',
+                                (amount, payload.message_id, emoji))
+        if amount < 0:
+            # only the updated row can drop to zero, it's found by the primary key
+            self.connection.execute('DELETE FROM reaction_usage '
+                                    'WHERE message_id = ? AND emoji = ? AND amount <= 0',
+                                    (payload.message_id, emoji))
+        self.commit_data([payload.guild_id])
+
+    def remove_reaction(self, payload):
+        '''Updates the index from on_raw_reaction_remove payload'''
+        self.add_reaction(payload, -1)
+
+    def clear_reactions(self, message_id, emoji_key=None, guild_id=None):
+        '''
+        Removes all reactions (or reactions of one emoji) from the message of the guild.
+        emoji_key is the custom emoji id or the unicode emoji, see get_reaction_key
+        '''
+        if emoji_key is None:
+            self._delete_rows('reaction_usage', message_id)
+        else:
+            self.connection.execute('DELETE FROM reaction_usage '
+                                    'WHERE message_id = ? AND emoji = ?',
+                                    (message_id, emoji_key))
+        self.commit_data([guild_id])
+
+    def _insert_text(self, message_id, channel_id, guild_id, author_id, content, created_at):
+        amounts = Counter(extract_emoji_keys(content))
+        rows = [(message_id, channel_id, guild_id, author_id, emoji, created_at, amount)
+                for emoji, amount in amounts.items()]
+        self.connection.executemany('INSERT OR REPLACE INTO text_usage '
+                                    'VALUES (?, ?, ?, ?, ?, ?, ?)', rows)
+
+    def _delete_rows(self, table: str, message_id: int):
+        self.connection.execute(f'DELETE FROM {table} WHERE message_id = ?', (message_id,))
+
+    # Coverage of the channel history
+
+    def get_coverage(self, channel_id: int) -> (datetime, datetime):
+        '''Returns (covered_from, covered_to) of the channel or None if it was never scanned'''
+        row = self.connection.execute('SELECT covered_from, covered_to FROM coverage '
+                                      'WHERE channel_id = ?', (channel_id,)).fetchone()
+        if not row:
+            return None
+        return from_timestamp(row[0]), from_timestamp(row[1])
+
+    def prepare_coverage(self, channel_id: int, guild_id: int, start: datetime, stop: datetime) \
+        -> (datetime, datetime):
+        '''
+        Returns covered range of the channel to continue scanning from.
+        If the channel was never scanned or the covered range can't be extended to the window
+        without scanning older messages, new empty range is started at stop.
+        '''
+        coverage = self.get_coverage(channel_id)
+        if coverage and (coverage[1] >= start or self.is_live(coverage[1])):
+            return coverage
+
+        stop_stamp = to_timestamp(stop)
+        self.connection.execute('INSERT OR REPLACE INTO coverage VALUES (?, ?, ?, ?, NULL)',
+                                (channel_id, guild_id, stop_stamp, stop_stamp))
+        self.connection.commit()
+        return stop, stop
+
+    def get_checkpoint(self, channel_id: int, covered_to: datetime) -> int:
+        '''
+        Returns id of the last scanned message, if the covered range ends at it, or None.
+        Scan of an interrupted range continues after that message, not after its time,
+        so messages sent in the same millisecond aren't skipped or scanned twice.
+        '''
+        row = self.connection.execute('SELECT last_message_id FROM coverage WHERE channel_id = ?',
+                                      (channel_id,)).fetchone()
+        # ids keep time in milliseconds
+        if not row or not row[0] or snowflake_time(row[0]) < covered_to - timedelta(milliseconds=1):
+            return None  # the range was extended without scanning, like by live events
+        return row[0]
+
+    def mark_stale(self, channel_id: int, since: datetime):
+        '''
+        Moves covered range of the channel back before since, as messages after it are missing,
+        so they are scanned again. The channel isn't treated as followed live until the scan.
+        '''
+        covered_to = to_timestamp(since)
+        if self.listening_since is not None:
+            covered_to = min(covered_to, self.listening_since)
+        # the scan starts after covered_to, so the range ends just before the message
+        # the last scanned message can be after the missing ones, so it's not a checkpoint now
+        self.connection.execute('UPDATE coverage SET covered_to = MIN(covered_to, ?), '
+                                'last_message_id = NULL WHERE channel_id = ?',
+                                (covered_to - 0.001, channel_id))
+        self.connection.commit()
+        logging.warning('Messages of channel %d were not indexed, it will be scanned again',
+                        channel_id)
+
+    def is_live(self, covered_to: datetime) -> bool:
+        '''Checks if the channel covered till covered_to is being followed by live events'''
+        if self.listening_since is None:
+            return False
+        return to_timestamp(covered_to) >= self.listening_since
+
+    def add_history_page(self, channel_id: int, messages, bot_id, oldest_first: bool):
+        '''
+        Adds page of the scanned channel history to the index.
+        Covered range is extended to the last message of the page in the same transaction,
+        so interrupted scan will continue from this page.
+        Old rows between the covered range and the page are replaced by the page messages.
+        '''
+        if not messages:
+            return
+        last_message = messages[-1]
+        checkpoint = to_timestamp(last_message.created_at)
+        self._delete_uncovered(channel_id, checkpoint, oldest_first)
+        for message in messages:
+            self._add_message(message, bot_id)
+
+        if oldest_first:
+            self.connection.execute('UPDATE coverage SET covered_to = MAX(covered_to, ?), '
+                                    'last_message_id = MAX(IFNULL(last_message_id, 0), ?) '
+                                    'WHERE channel_id = ?',
+                                    (checkpoint, last_message.id, channel_id))
+        else:
+            self.connection.execute('UPDATE coverage SET covered_from = MIN(covered_from, ?), '
+                                    'last_message_id = MAX(IFNULL(last_message_id, 0), ?) '
+                                    'WHERE channel_id = ?',
+                                    (checkpoint, messages[0].id, channel_id))
+        self.commit_data([self._get_guild_id(channel_id)])
+
+    def extend_coverage(self, channel_id: int, start: datetime = None, stop: datetime = None):
+        '''Extends covered range of the channel after the scan till start or stop is finished'''
+        if start is not None:
+            self._delete_uncovered(channel_id, to_timestamp(start), False)
+            self.connection.execute('UPDATE coverage SET covered_from = MIN(covered_from, ?) '
+                                    'WHERE channel_id = ?', (to_timestamp(start), channel_id))
+        if stop is not None:
+            self._delete_uncovered(channel_id, to_timestamp(stop), True)
+            self.connection.execute('UPDATE coverage SET covered_to = MAX(covered_to, ?) '
+                                    'WHERE channel_id = ?', (to_timestamp(stop), channel_id))
+        self.commit_data([self._get_guild_id(channel_id)])
+
+    def _get_guild_id(self, channel_id: int) -> int:
+        row = self.connection.execute('SELECT guild_id FROM coverage WHERE channel_id = ?',
+                                      (channel_id,)).fetchone()
+        return row[0] if row else None
+
+    def _delete_uncovered(self, channel_id: int, time: float, newer: bool):
+        '''
+        Deletes rows of the channel between its covered range and time, newer or older than
+        the range, before the scan adds that part of the history again.
+        So messages deleted, while the bot wasn't listening, aren't counted anymore.
+        '''
+        row = self.connection.execute('SELECT guild_id, covered_from, covered_to FROM coverage '
+                                      'WHERE channel_id = ?', (channel_id,)).fetchone()
+        if not row:
+            return
+        guild_id, covered_from, covered_to = row
+        # the guild is in the condition, so the rows are found by the time index
+        if newer:
+            condition, bounds = 'created_at > ? AND created_at <= ?', (covered_to, time)
+        else:
+            condition, bounds = 'created_at >= ? AND created_at < ?', (time, covered_from)
+        for table in ('text_usage', 'reaction_usage'):
+            self.connection.execute(f'DELETE FROM {table} WHERE guild_id = ? AND channel_id = ? '
+                                    f'AND {condition}', (guild_id, channel_id) + bounds)
+
+    # Reading from the index
+
+    def count_emoji_by(self, guild_id: int, start: datetime, stop: datetime, by_channel: bool):
+        '''
+        Returns (emoji, owner id, amount) rows of emoji used in the guild between start and stop.
+        Owner is the channel or the author of the message, reactions have no author,
+        so they are counted only by channel.
+        '''
+        bounds = (guild_id, to_timestamp(start), to_timestamp(stop))
+        if not by_channel:
+            return self.connection.execute('SELECT emoji, author_id, SUM(amount) FROM text_usage'
+                                           ' WHERE guild_id = ? AND created_at >= ?'
+                                           ' AND created_at < ? AND author_id IS NOT NULL'
+                                           ' GROUP BY emoji, author_id', bounds).fetchall()
+        query = ('SELECT emoji, channel_id, SUM(amount) FROM ('
+                 ' SELECT emoji, channel_id, amount FROM text_usage'
+                 '  WHERE guild_id = ? AND created_at >= ? AND created_at < ?'
+                 ' UNION ALL'
+                 ' SELECT emoji, channel_id, amount FROM reaction_usage'
+                 '  WHERE guild_id = ? AND created_at >= ? AND created_at < ?'
+                 ') GROUP BY emoji, channel_id')
+        return self.connection.execute(query, bounds + bounds).fetchall()
+
+    def get_first_day(self, guild_id: int) -> int:
+        '''Returns number of the first UTC day covered in any channel of the guild, or None'''
+        row = self.connection.execute('SELECT MIN(covered_from) FROM coverage WHERE guild_id = ?',
+                                      (guild_id,)).fetchone()
+        if row[0] is None:
+            return None
+        return int(row[0] // SECONDS_PER_DAY)
+
+    def get_daily_rows(self, guild_id: int, first_day: int) -> [(str, int, int)]:
+        '''Returns (emoji, day number, amount) rows of the guild, starting from the first_day'''
+        query = ('SELECT emoji, CAST(created_at / ? AS INTEGER) AS day, SUM(amount) FROM ('
+                 ' SELECT emoji, created_at, amount FROM text_usage'
+                 '  WHERE guild_id = ? AND created_at >= ?'
+                 ' UNION ALL'
+                 ' SELECT emoji, created_at, amount FROM reaction_usage'
+                 '  WHERE guild_id = ? AND created_at >= ?'
+                 ') GROUP BY emoji, day')
+        bounds = (guild_id, first_day * SECONDS_PER_DAY)
+        return self.connection.execute(query, (SECONDS_PER_DAY,) + bounds + bounds).fetchall()
+
+
+def open_index(path: str) -> EmojiIndex:
+    '''Opens emoji index file, returns None if path is empty or the file can't be opened'''
+    if not path:
+        return None
+    try:
+        return EmojiIndex(path)
+    except sqlite3.Error as error:
+        logging.error("Can't open emoji index '%s': %s", path, error)
+        return None
@@ -2,33 +2,64 @@
 import logging
 from datetime import datetime
 from discord import User
-from bot_settings.settings import ActionSettings, SystemSettings, BotSettings
+from bot_settings.settings import ActionSettings, BotSettings, PermissionSet
+from .throttle import ActionThrottle, get_limits
 
-async def handle_messages(client, channel, check_time, handler, container):
+# discord returns up to 100 messages per history request
+HISTORY_PAGE_SIZE = 100
+
+async def iterate_messages(channel, check_time, before=None):
+    '''
+    Yields every message from channel, sent during check_time before the before time
+    (or current time if not set). History is read in a single pass, from newest to oldest.
+    '''
+    stop_time = before or datetime.utcnow()
+    start_time = stop_time - check_time
+    seen_ids = set()
+
+    # after would only filter the pages, discord.py would still read the whole history
+    async for msg in channel.history(limit=None, before=stop_time, oldest_first=False):
+        if msg.created_at < start_time:
+            break  # history is sorted, everything after is out of the window
+        if msg.created_at > stop_time or msg.id in seen_ids:
+            continue
+        seen_ids.add(msg.id)
+        yield msg
+
+
+async def iterate_pages(channel, after, before: datetime, oldest_first: bool,
+                        page_size=HISTORY_PAGE_SIZE):
+    '''
+    Yields lists of messages from channel between after and before, page by page.
+    after is a datetime, for oldest_first it can be a message (any object with id) too,
+    the history continues after it.
+    '''
+    # discord.py reads pages from one bound till the end of the history and only filters them
+    # by the other one, so only the first bound is passed and the scan stops by itself
+    if oldest_first:
+        history = channel.history(limit=None, after=after, oldest_first=True)
+    else:
+        history = channel.history(limit=None, before=before, oldest_first=False)
+    page = []
+    async for msg in history:
+        if (msg.created_at >= before) if oldest_first else (msg.created_at <= after):
+            break
+        page.append(msg)
+        if len(page) >= page_size:
+            yield page
+            page = []
+
+    if page:
+        yield page
+
+
+async def handle_messages(client, channel, check_time, handler, container, before=None):
     '''
     Runs handler on every message from channel between start_time and stop_time
+    Messages are checked for check_time before the before time (or current time if not set)
     '''
-    start = datetime.utcnow()
-    start_time = start
-    stop_time = start - check_time
-    id_list = []
-    while start_time > stop_time:
-        is_empty = True  # if there is any messages between start and stop
-        # todo: look for a better way to check it
-
-        async for msg in channel.history(limit=None, before=start,
-                                         after=stop_time):
-            is_empty = False
-            start = msg
-            start_time = msg.created_at
-            if start_time > stop_time and msg.id not in id_list:  # todo: should it be checked?
-                id_list.append(msg.id)
-                handler(msg, container, client.user.id)  # container =
-            else:
-                break  # found message after stop_time
-
-        if is_empty:
-            break  # no more messages to check between start and stop
+    async for msg in iterate_messages(channel, check_time, before):
+        handler(msg, container, client.user.id)
 
 
 def get_action_by_command(author: User, command: str, bot_settings: BotSettings) \
@@ -37,13 +68,7 @@ def get_action_by_command(author: User, command: str, bot_settings: BotSettings)
     Returns action as a string or None if command is not available.
     If action is not available, logs why.
     '''
-    result_action = None
-
-    for action, setup in bot_settings.action_settings.items():
-        # setup must contains keywords fields based on settings code
-        if command in setup.keywords:
-            result_action = action
-            break
+    result_action = bot_settings.keyword_index.get(command)
 
     if not result_action:
         logging.error("Can't find action for command '%s'!", command)
@@ -55,46 +80,98 @@ def get_action_by_command(author: User, command: str, bot_settings: BotSettings)
         logging.info("Called action '%s' is not active", result_action)
         return None, None
 
-    if not is_action_allowed(author, result_action_settings, bot_settings.system_settings):
+    if not is_action_allowed(author, result_action, bot_settings):
         logging.info("Called action '%s' is forbidden for user '%s'", result_action,
                      author.display_name)
         return None, None
 
     return result_action, result_action_settings
 
-def is_action_allowed(user: User, action_settings: ActionSettings, system_settings: SystemSettings)\
-    -> bool:
+def get_userspaces(user: User) -> {str}:
+    '''Returns set of names and ids of the user and their roles'''
+    userspaces = {str(user), str(user.id)}
+    for role in user.roles:
+        userspaces.add(str(role))
+        userspaces.add(str(role.id))
+    return userspaces
+
+
+def is_admin(user: User, bot_settings: BotSettings) -> bool:
+    '''Checks, if the user is a guild administrator or one of the bot admins (by name or role)'''
+    if user.guild_permissions.administrator:
+        return True
+
+    return not bot_settings.admin_set.isdisjoint(get_userspaces(user))
+
+
+def is_action_allowed(user: User, action: str, bot_settings: BotSettings) -> bool:
     '''
     Checks, if the user is allowed to use an action.
     User will be allowed to use action if they are in the whitelist and not in the blacklist.
     Admins are allowed to use any actions.
+    Results are cached per member and their roles, see invalidate_authorization.
+    '''
+    role_ids = frozenset(role.id for role in user.roles)
+    guild_cache = bot_settings.authorization_cache.setdefault(user.guild.id, dict())
+    member_cache = guild_cache.setdefault(user.id, dict())
+
+    key = (role_ids, action)
+    if key not in member_cache:
+        member_cache[key] = check_permissions(user, bot_settings.permission_sets[action],
+                                              bot_settings)
+    return member_cache[key]
+
+
+def get_throttle_delay(user: User, action: str, cost: float, action_settings: ActionSettings,
+                       bot_settings: BotSettings, throttle: ActionThrottle, take=True) -> float:
     '''
+    Takes the cost of the call from the user and guild limits of the action,
+    with take=False only checks it. Returns seconds to wait, if the limits are exceeded, or 0.
+    Admins are never throttled.
+    '''
+    limits = get_limits(action_settings)
+    if not (limits.user > 0 or limits.guild > 0):
+        return 0.0
+    if is_admin(user, bot_settings):
+        return 0.0
+    return throttle.check(action, limits, user.id, user.guild.id, cost, take)
+
+
+def charge_throttle(user: User, action: str, cost: float, action_settings: ActionSettings,
+                    bot_settings: BotSettings, throttle: ActionThrottle):
+    '''Takes the cost of the call, that was checked with take=False, admins are not charged'''
+    limits = get_limits(action_settings)
+    if (limits.user > 0 or limits.guild > 0) and not is_admin(user, bot_settings):
+        throttle.charge(action, limits, user.id, user.guild.id, cost)
+
 
+def check_permissions(user: User, permissions: PermissionSet, bot_settings: BotSettings) -> bool:
+    '''Checks the user against compiled whitelist and blacklist of the action'''
     if user.guild_permissions.administrator:
         return True
 
-    if str(user) in system_settings.admins:
+    userspaces = get_userspaces(user)
+    if not bot_settings.admin_set.isdisjoint(userspaces):
         return True
 
-    userspaces = [str(user)]
-    for role in user.roles:
-        userspaces.append(str(role))
-
-    is_in_whitelist = False
     # Empty whitelist means everyone is in whitelist
-    if action_settings.call_whitelist:
-        for userspace in userspaces:
-            if userspace in action_settings.call_whitelist:
-                is_in_whitelist = True
-                break
-    else:
-        is_in_whitelist = True
-
-    is_in_blacklist = False
+    is_in_whitelist = not permissions.whitelist or not permissions.whitelist.isdisjoint(userspaces)
     # Empty blacklist means noone is in blacklist
-    for userspace in userspaces:
-        if userspace in action_settings.call_blacklist:
-            is_in_blacklist = True
-            break
+    is_in_blacklist = not permissions.blacklist.isdisjoint(userspaces)
 
     return is_in_whitelist and not is_in_blacklist
+
+
+def invalidate_authorization(bot_settings: BotSettings, guild_id: int, member_id: int = None):
+    '''
+    Removes cached permission checks for the member or for the whole guild.
+    guild_id None removes checks of the member in all guilds, like after the username change.
+    Should be called on member, user and role updates.
+    '''
+    if guild_id is None:
+        for guild_cache in bot_settings.authorization_cache.values():
+            guild_cache.pop(member_id, None)
+    elif member_id is None:
+        bot_settings.authorization_cache.pop(guild_id, None)
+    elif guild_id in bot_settings.authorization_cache:
+        bot_settings.authorization_cache[guild_id].pop(member_id, None)
@@ -0,0 +1,80 @@
+'''File with the scheduler for long-running jobs, like history scans'''
+import asyncio
+from collections import Counter, OrderedDict, deque
+import logging
+
+
+class JobScheduler:
+    '''
+    Runs expensive jobs with global and per-guild concurrency limits.
+    Guilds with pending jobs take turns, so one busy guild can't block the others.
+    Identical jobs (with the same key) are coalesced: callers share one run and its result.
+    '''
+
+    def __init__(self, max_jobs: int, max_guild_jobs: int):
+        self.max_jobs = max(1, max_jobs)
+        self.max_guild_jobs = max(1, max_guild_jobs)
+        self.pending = OrderedDict()  # {guild_id: deque([(key, job_factory)])}
+        self.running = Counter()  # {guild_id: amount of running jobs}
+        self.running_total = 0
+        self.futures = dict()  # {key: future} for both pending and running jobs
+
+    async def run(self, key, guild_id: int, job_factory):
+        '''
+        Runs coroutine returned by job_factory() as a job and returns its result.
+        If the job with the same key is already pending or running, waits for it instead.
+        '''
+        future = self.futures.get(key)
+        if future is None:
+            future = asyncio.get_event_loop().create_future()
+            self.futures[key] = future
+            self.pending.setdefault(guild_id, deque()).append((key, job_factory))
+            self.schedule()
+        else:
+            logging.info('Job %s is already in progress, waiting for its result', key)
+
+        # one of the callers being cancelled shouldn't cancel the job for the others
+        return await asyncio.shield(future)
+
+    def schedule(self):
+        '''Starts pending jobs while the limits allow it'''
+        while self.running_total < self.max_jobs:
+            guild_id = self.get_next_guild()
+            if guild_id is None:
+                return
+
+            guild_jobs = self.pending[guild_id]
+            key, job_factory = guild_jobs.popleft()
+            if guild_jobs:
+                # the guild goes to the end of the line
+                self.pending.move_to_end(guild_id)
+            else:
+                del self.pending[guild_id]
+
+            self.running[guild_id] += 1
+            self.running_total += 1
+            asyncio.ensure_future(self.execute(key, guild_id, job_factory))
+
+    def get_next_guild(self) -> int:
+        '''Returns the first guild in the line, that can start one more job'''
+        for guild_id in self.pending:
+            if self.running[guild_id] < self.max_guild_jobs:
+                return guild_id
+        return None
+
+    async def execute(self, key, guild_id: int, job_factory):
+        '''Runs the job and passes its result or error to the callers'''
+        future = self.futures[key]
+        try:
+            result = await job_factory()
+        except Exception as error:  # pylint: disable=broad-except
+            future.set_exception(error)
+        else:
+            future.set_result(result)
+        finally:
+            del self.futures[key]
+            self.running[guild_id] -= 1
+            if not self.running[guild_id]:
+                del self.running[guild_id]
+            self.running_total -= 1
+            self.schedule()
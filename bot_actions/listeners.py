@@ -0,0 +1,108 @@
+'''File with the passive listeners, that see every message, but don't answer to it'''
+import asyncio
+import logging
+
+
+class MessageListener:
+    '''Interface for the listener, that gets every message in batches'''
+
+    async def handle_messages(self, messages):
+        '''Handles the batch of messages, in the order they were received'''
+        logging.warning('Default handle_messages method is not overriden!')
+
+    def message_dropped(self, message):
+        '''
+        Called instead of handle_messages for the message, that didn't fit into the queue,
+        and for every message of the batch, that handle_messages failed to handle
+        '''
+
+
+class EmojiIndexListener(MessageListener):
+    '''
+    Keeps the emoji index up to date with the new messages.
+    Batches are written by the index thread, so the event loop doesn't wait for the file.
+    '''
+
+    def __init__(self, emoji_index, client):
+        self.emoji_index = emoji_index
+        self.client = client
+        self.stale_channels = dict()  # {channel_id: creation time of the oldest dropped message}
+
+    async def handle_messages(self, messages):
+        bot_id = self.client.user.id if self.client.user else None
+        emoji_index = self.emoji_index
+        await emoji_index.run(emoji_index.add_messages, messages, bot_id)
+        for channel_id, since in list(self.stale_channels.items()):
+            await emoji_index.run(emoji_index.mark_stale, channel_id, since)
+            # older message could be dropped while waiting, then it's marked with the next batch
+            if self.stale_channels.get(channel_id) == since:
+                del self.stale_channels[channel_id]
+
+    def message_dropped(self, message):
+        # the message is missing in the index, so the channel is scanned again on the next count
+        channel_id = message.channel.id
+        since = self.stale_channels.get(channel_id)
+        if since is None or message.created_at < since:
+            self.stale_channels[channel_id] = message.created_at
+
+
+class ListenerPipeline:
+    '''
+    Passes every message to the registered listeners through the bounded queue.
+    Receiving the message only puts it into the queue, so the command handling doesn't wait
+    for the listeners, however many of them are registered. The background consumer takes
+    messages in batches of up to batch_size. When the listeners can't keep up and the queue
+    is full, new messages are dropped and the listeners are told about it.
+    '''
+
+    def __init__(self, max_size: int, batch_size: int):
+        self.listeners = []
+        self.max_size = max_size
+        self.batch_size = max(batch_size, 1)
+        self.queue = asyncio.Queue(max_size)
+        self.consumer = None
+        # counters for the stats
+        self.processed = 0
+        self.dropped = 0
+        self.errors = 0
+
+    def register(self, listener: MessageListener):
+        '''Adds the listener, it gets messages received after this call'''
+        self.listeners.append(listener)
+
+    @property
+    def depth(self) -> int:
+        '''Amount of messages waiting in the queue'''
+        return self.queue.qsize()
+
+    def offer(self, message):
+        '''Puts the message into the queue, never waits'''
+        if not self.listeners:
+            return
+        if self.consumer is None:
+            self.consumer = asyncio.ensure_future(self.consume())
+        try:
+            self.queue.put_nowait(message)
+        except asyncio.QueueFull:
+            self.dropped += 1
+            for listener in self.listeners:
+                listener.message_dropped(message)
+
+    async def consume(self):
+        '''Passes queued messages to the listeners in batches, runs forever'''
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+
+            for listener in self.listeners:
+                try:
+                    await listener.handle_messages(batch)
+                except Exception:  # pylint: disable=broad-except
+                    self.errors += 1
+                    logging.exception('Listener %s failed to handle %d messages',
+                                      type(listener).__name__, len(batch))
+                    # the messages are lost for the listener, like the ones not fitting the queue
+                    for message in batch:
+                        listener.message_dropped(message)
+            self.processed += len(batch)
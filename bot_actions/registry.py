@@ -0,0 +1,70 @@
+'''File with the registry of actions, that imports action modules on first use'''
+from collections.abc import Mapping
+import importlib
+import logging
+import time
+
+from bot_settings.settings import BotSettings
+
+# entry points of the built-in actions as 'module:Class'
+# other actions can be plugged in with the entry_point option in their settings section
+DEFAULT_ENTRY_POINTS = {
+    'CountEmoji': 'bot_actions.emoji_counter:EmojiCounter',
+    'Help': 'bot_actions.actions:HelpMessage',
+    'ConvertTime': 'bot_actions.convert_time:ConvertTime',
+    'Stats': 'bot_actions.actions:StatsReport',
+}
+
+
+class ActionRegistry(Mapping):
+    '''
+    Maps action names to action classes.
+    Module of the action is imported on the first access, so unused actions don't slow the start.
+    Actions, that can't be loaded, raise KeyError as the unknown ones.
+    '''
+
+    def __init__(self, entry_points: {str: str}):
+        self.entry_points = entry_points
+        self.classes = dict()
+
+    @classmethod
+    def from_settings(cls, bot_settings: BotSettings):
+        '''Creates registry of the built-in actions and the ones with entry_point in settings'''
+        entry_points = dict(DEFAULT_ENTRY_POINTS)
+        for name, action_settings in bot_settings.action_settings.items():
+            entry_point = action_settings.settings.get('entry_point')
+            if entry_point:
+                entry_points[name] = entry_point
+        return cls(entry_points)
+
+    def __getitem__(self, name: str):
+        action_class = self.classes.get(name)
+        if action_class is None:
+            action_class = self.load(name)
+        return action_class
+
+    def __contains__(self, name) -> bool:
+        # don't import the module just to check the name
+        return name in self.entry_points
+
+    def __iter__(self):
+        return iter(self.entry_points)
+
+    def __len__(self) -> int:
+        return len(self.entry_points)
+
+    def load(self, name: str):
+        '''Imports the action class by its entry point'''
+        entry_point = self.entry_points[name]
+        module_name, _, class_name = entry_point.partition(':')
+        start = time.perf_counter()
+        try:
+            action_class = getattr(importlib.import_module(module_name), class_name)
+        except (ImportError, AttributeError) as error:
+            logging.error("Can't load action %s from '%s': %r", name, entry_point, error)
+            raise KeyError(name) from error
+
+        logging.info('Loaded action %s from %s in %.1f ms', name, entry_point,
+                     (time.perf_counter() - start) * 1000)
+        self.classes[name] = action_class
+        return action_class
@@ -0,0 +1,138 @@
+'''File with the renderer, that packs emoji reports into the fewest messages'''
+from collections import namedtuple
+import csv
+import io
+
+from discord import Embed, Emoji, File
+
+# discord limits of one embed
+MAX_FIELDS = 25
+MAX_FIELD_CHARS = 1024
+MAX_EMBED_CHARS = 6000
+# fields are shown as columns, short ones make the report easier to read
+MAX_FIELD_LINES = 20
+# name of the field is required, but the columns don't need one
+FIELD_NAME = '\u200b'
+
+# footer of the last page, the budget of every page leaves room for it
+FOOTER = 'The end!'
+
+# reports, that don't fit into this many messages, are sent as a CSV file
+MAX_EMBED_MESSAGES = 2
+CSV_FILENAME = 'emoji_report.csv'
+
+# pages are lists of embed fields, csv is the file content in case the report is too big
+RenderedReport = namedtuple('RenderedReport', 'pages csv')
+
+
+def pack_fields(lines: [str]) -> [str]:
+    '''Joins lines into field values, keeping them in the field limits'''
+    fields = []
+    field_lines = []
+    field_chars = 0
+    for line in lines:
+        if field_lines and (len(field_lines) >= MAX_FIELD_LINES
+                            or field_chars + len(line) + 1 > MAX_FIELD_CHARS):
+            fields.append('\n'.join(field_lines))
+            field_lines, field_chars = [], 0
+        field_lines.append(line)
+        field_chars += len(line) + 1
+    if field_lines:
+        fields.append('\n'.join(field_lines))
+    return fields
+
+
+def pack_pages(fields: [str]) -> [[str]]:
+    '''Groups fields into pages, one page is one embed'''
+    pages = []
+    page = []
+    page_chars = 0
+    for field in fields:
+        field_chars = len(FIELD_NAME) + len(field)
+        if page and (len(page) >= MAX_FIELDS
+                     or page_chars + field_chars > MAX_EMBED_CHARS - len(FOOTER)):
+            pages.append(page)
+            page, page_chars = [], 0
+        page.append(field)
+        page_chars += field_chars
+    if page:
+        pages.append(page)
+    return pages
+
+
+def get_emoji_columns(emoji) -> (str, str):
+    '''Returns emoji name and id for CSV, unicode emoji have no id'''
+    if isinstance(emoji, str):
+        return emoji, ''
+    return emoji.name, emoji.id
+
+
+def to_csv(emojis: [(Emoji, int)]) -> bytes:
+    '''Returns CSV file content with emoji name, id and amount'''
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(('emoji', 'id', 'amount'))
+    for emoji, amount in emojis:
+        writer.writerow(get_emoji_columns(emoji) + (amount,))
+    return output.getvalue().encode('utf-8')
+
+
+def breakdown_to_csv(pairs: [(Emoji, int, int)], by_channel: bool) -> bytes:
+    '''Returns CSV file content with emoji name, id, user or channel id and amount'''
+    output = io.StringIO()
+    writer = csv.writer(output)
+    writer.writerow(('emoji', 'id', 'channel_id' if by_channel else 'user_id', 'amount'))
+    for emoji, owner_id, amount in pairs:
+        writer.writerow(get_emoji_columns(emoji) + (owner_id, amount))
+    return output.getvalue().encode('utf-8')
+
+
+def render_lines(lines: [str], get_csv) -> RenderedReport:
+    '''
+    Renders lines as embed pages with columns.
+    If the pages don't fit into MAX_EMBED_MESSAGES, the report is rendered by get_csv instead.
+    '''
+    pages = pack_pages(pack_fields(lines))
+    if len(pages) > MAX_EMBED_MESSAGES:
+        return RenderedReport([], get_csv())
+    return RenderedReport(pages, None)
+
+
+def get_report_lines(emojis: [(Emoji, int)]) -> [str]:
+    '''Returns "emoji amount" line for every counted emoji'''
+    return [f'{emoji} {amount}' for emoji, amount in emojis]
+
+
+def render_emoji_report(emojis: [(Emoji, int)]) -> RenderedReport:
+    '''Renders counted emoji as "emoji amount" lines'''
+    return render_lines(get_report_lines(emojis), lambda: to_csv(emojis))
+
+
+def render_breakdown_report(emojis: [(Emoji, int, [(int, int)])], by_channel: bool,
+                            get_pairs) -> RenderedReport:
+    '''
+    Renders emoji with their amount and top users or channels as mentions,
+    like "emoji amount: @user 5, @other 2". CSV has all pairs, returned by get_pairs.
+    '''
+    mention = '<#{}>' if by_channel else '<@{}>'
+    lines = []
+    for emoji, amount, top in emojis:
+        owners = ', '.join(f'{mention.format(owner_id)} {owner_amount}'
+                           for owner_id, owner_amount in top)
+        lines.append(f'{emoji} {amount}: {owners}')
+    return render_lines(lines, lambda: breakdown_to_csv(get_pairs(), by_channel))
+
+
+def make_embed(page: [str], last=False) -> Embed:
+    '''Creates embed with the page fields as inline columns, the last one gets the footer'''
+    embed = Embed()
+    for field in page:
+        embed.add_field(name=FIELD_NAME, value=field, inline=True)
+    if last:
+        embed.set_footer(text=FOOTER)
+    return embed
+
+
+def make_file(report: RenderedReport) -> File:
+    '''Creates file to attach to the message, it can be sent only once'''
+    return File(io.BytesIO(report.csv), filename=CSV_FILENAME)
@@ -0,0 +1,66 @@
+'''File with the cache for results of expensive actions'''
+from collections import OrderedDict
+import sys
+import time
+
+
+def estimate_size(value) -> int:
+    '''
+    Returns approximate memory size of the value in bytes.
+    Lists, tuples and dicts are measured with their items, other objects are measured shallowly.
+    '''
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for key, item in value.items():
+            size += estimate_size(key) + estimate_size(item)
+    elif isinstance(value, (list, tuple)):
+        for item in value:
+            size += estimate_size(item)
+    return size
+
+
+class ResultCache:
+    '''
+    LRU cache for action results with the time to live.
+    Memory used by the cached values is bounded by max_bytes, the oldest used entries are evicted.
+    '''
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.entries = OrderedDict()  # {key: (created_at, size, value)}
+
+    def get(self, key, ttl: float):
+        '''Returns (value, age in seconds) or None if there is no fresh value for the key'''
+        entry = self.entries.get(key)
+        if entry is None:
+            return None
+
+        created_at, _, value = entry
+        age = time.time() - created_at
+        if age > ttl:
+            self.invalidate(key)
+            return None
+
+        self.entries.move_to_end(key)
+        return value, age
+
+    def put(self, key, value):
+        '''Stores the value, evicting least recently used entries to fit into the memory limit'''
+        self.invalidate(key)
+        size = estimate_size(value)
+        if size > self.max_bytes:
+            return  # it will never fit
+
+        while self.total_bytes + size > self.max_bytes:
+            _, (_, evicted_size, _) = self.entries.popitem(last=False)
+            self.total_bytes -= evicted_size
+
+        self.entries[key] = (time.time(), size, value)
+        self.total_bytes += size
+
+    def invalidate(self, key):
+        '''Removes the entry from the cache, if it's there'''
+        entry = self.entries.pop(key, None)
+        if entry:
+            self.total_bytes -= entry[1]
@@ -0,0 +1,164 @@
+'''File with the instrumentation of actions: call counts, errors and latency histograms'''
+import asyncio
+from bisect import bisect_left
+from contextlib import contextmanager
+import logging
+import os
+import time
+
+# upper bounds of histogram buckets in seconds, the last bucket is +Inf
+LATENCY_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30, 60, 300)
+
+# name of the action for messages, that were parsed without finding an action
+NO_ACTION = 'None'
+
+
+class Histogram:
+    '''Latency histogram with fixed buckets, like the Prometheus one'''
+
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.bucket_counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, seconds: float):
+        '''Adds one measurement to the histogram'''
+        self.bucket_counts[bisect_left(self.buckets, seconds)] += 1
+        self.count += 1
+        self.sum += seconds
+
+    def quantile(self, fraction: float) -> float:
+        '''Returns upper bound of the bucket, that contains the quantile'''
+        if not self.count:
+            return 0.0
+        rank = fraction * self.count
+        seen = 0
+        for index, bucket_count in enumerate(self.bucket_counts):
+            seen += bucket_count
+            if seen >= rank and bucket_count:
+                return self.buckets[index] if index < len(self.buckets) else float('inf')
+        return float('inf')
+
+
+class ActionStats:
+    '''Counters and histograms of one action'''
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.parse = Histogram()
+        self.execute = Histogram()
+
+
+class BotStats:
+    '''Collects stats of all actions, can format them for the chat or for Prometheus'''
+
+    def __init__(self):
+        self.actions = dict()
+        self.started_at = time.time()
+        self.export_task = None
+        # labels added to every exported metric, like shards of the process
+        self.labels = dict()
+        self.listeners = None  # ListenerPipeline of the message handler
+
+    def get_action_stats(self, action_name: str) -> ActionStats:
+        '''Returns stats of the action, creating them on first use'''
+        if action_name not in self.actions:
+            self.actions[action_name] = ActionStats()
+        return self.actions[action_name]
+
+    @staticmethod
+    def get_action_name(action) -> str:
+        '''Returns name of the action to group stats by'''
+        return type(action).__name__ if action else NO_ACTION
+
+    def record_parse(self, action, seconds: float):
+        '''Records time spent to parse the message, that resulted to the action'''
+        self.get_action_stats(self.get_action_name(action)).parse.observe(seconds)
+
+    @contextmanager
+    def measure_execute(self, action):
+        '''Context manager, that records call, its duration and error of the action execution'''
+        action_stats = self.get_action_stats(self.get_action_name(action))
+        action_stats.calls += 1
+        start = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            action_stats.errors += 1
+            raise
+        finally:
+            action_stats.execute.observe(time.perf_counter() - start)
+
+    def format_report(self) -> str:
+        '''Returns human-readable report with latencies in milliseconds'''
+        uptime = int(time.time() - self.started_at)
+        lines = [f'Uptime: {uptime // 3600}h {uptime % 3600 // 60}m']
+        for name, action_stats in sorted(self.actions.items()):
+            parse, execute = action_stats.parse, action_stats.execute
+            lines.append(f'{name}: {action_stats.calls} calls, {action_stats.errors} errors, '
+                         f'parse p50/p99 {parse.quantile(0.5) * 1000:g}/'
+                         f'{parse.quantile(0.99) * 1000:g} ms, '
+                         f'execute p50/p99 {execute.quantile(0.5) * 1000:g}/'
+                         f'{execute.quantile(0.99) * 1000:g} ms')
+        if self.listeners:
+            listeners = self.listeners
+            lines.append(f'Listeners: queue {listeners.depth}/{listeners.max_size}, '
+                         f'{listeners.processed} processed, {listeners.dropped} dropped, '
+                         f'{listeners.errors} errors')
+        return '\n'.join(lines)
+
+    def to_prometheus(self) -> str:
+        '''Returns stats in Prometheus text exposition format'''
+        lines = ['# TYPE foodbot_action_calls_total counter',
+                 '# TYPE foodbot_action_errors_total counter',
+                 '# TYPE foodbot_action_seconds histogram']
+        common_labels = ''.join(f'{key}="{value}",' for key, value in sorted(self.labels.items()))
+        for name, action_stats in sorted(self.actions.items()):
+            action_labels = f'{common_labels}action="{name}"'
+            lines.append(f'foodbot_action_calls_total{{{action_labels}}} {action_stats.calls}')
+            lines.append(f'foodbot_action_errors_total{{{action_labels}}} {action_stats.errors}')
+            for phase, histogram in (('parse', action_stats.parse),
+                                     ('execute', action_stats.execute)):
+                labels = f'{action_labels},phase="{phase}"'
+                cumulative = 0
+                for bound, bucket_count in zip(histogram.buckets + ('+Inf',),
+                                               histogram.bucket_counts):
+                    cumulative += bucket_count
+                    lines.append(f'foodbot_action_seconds_bucket{{{labels},le="{bound}"}} '
+                                 f'{cumulative}')
+                lines.append(f'foodbot_action_seconds_sum{{{labels}}} {histogram.sum}')
+                lines.append(f'foodbot_action_seconds_count{{{labels}}} {histogram.count}')
+        if self.listeners:
+            labels = f'{{{common_labels.rstrip(",")}}}' if common_labels else ''
+            lines.extend(['# TYPE foodbot_listener_queue_depth gauge',
+                          f'foodbot_listener_queue_depth{labels} {self.listeners.depth}',
+                          '# TYPE foodbot_listener_messages_total counter',
+                          f'foodbot_listener_messages_total{labels} {self.listeners.processed}',
+                          '# TYPE foodbot_listener_dropped_total counter',
+                          f'foodbot_listener_dropped_total{labels} {self.listeners.dropped}',
+                          '# TYPE foodbot_listener_errors_total counter',
+                          f'foodbot_listener_errors_total{labels} {self.listeners.errors}'])
+        return '\n'.join(lines) + '\n'
+
+    def write_prometheus(self, path: str):
+        '''Writes stats to the file, replacing it at once, so scraper never reads half of it'''
+        temp_path = path + '.tmp'
+        with open(temp_path, 'w') as stats_file:
+            stats_file.write(self.to_prometheus())
+        os.replace(temp_path, path)
+
+    def start_export(self, path: str, interval: int):
+        '''Starts writing stats to the file every interval seconds, if not started yet'''
+        if path and interval > 0 and not self.export_task:
+            self.export_task = asyncio.ensure_future(self.export(path, interval))
+
+    async def export(self, path: str, interval: int):
+        '''Writes stats to the file every interval seconds'''
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.write_prometheus(path)
+            except OSError as error:
+                logging.error("Can't write stats to %s: %s", path, error)
@@ -0,0 +1,88 @@
+'''File with the throttle, that limits how often users and guilds can call expensive actions'''
+from collections import namedtuple
+
+from .token_bucket import TokenBucket
+
+# limits of the action from its settings, in cost units per period seconds, 0 is no limit
+ThrottleLimits = namedtuple('ThrottleLimits', 'user guild period')
+
+# full buckets are dropped after this many checks, so users calling once don't stay in memory
+PRUNE_INTERVAL = 1000
+
+
+def get_limits(action_settings) -> ThrottleLimits:
+    '''Reads user_limit, guild_limit and limit_period options of the action'''
+    settings = action_settings.settings
+    return ThrottleLimits(float(settings.get('user_limit', 0)),
+                          float(settings.get('guild_limit', 0)),
+                          float(settings.get('limit_period', 60)))
+
+
+class ActionThrottle:
+    '''
+    Token buckets of every user and every guild, separate for every action.
+    Calls take the cost of the action from both buckets, so cheap actions with their own
+    limits (or without them) are never starved by expensive ones.
+    '''
+
+    def __init__(self):
+        # {(action, limits, 'user' or 'guild', id): TokenBucket}
+        # limits are in the key, so reloaded settings start new buckets
+        self.buckets = dict()
+        self.checks = 0
+
+    def get_bucket(self, key: tuple, capacity: float, period: float) -> TokenBucket:
+        '''Returns bucket by the key, creating a full one on first use'''
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = TokenBucket(capacity, period)
+            self.buckets[key] = bucket
+        return bucket
+
+    def get_owner_buckets(self, action: str, limits: ThrottleLimits, user_id: int,
+                          guild_id: int, cost: float) -> [(TokenBucket, float)]:
+        '''Returns (bucket, tokens to take) of the user and the guild, that have limits'''
+        if limits.period <= 0 or not (limits.user > 0 or limits.guild > 0):
+            return []
+
+        self.checks += 1
+        if self.checks % PRUNE_INTERVAL == 0:
+            self.prune()
+
+        buckets = []
+        for scope, capacity, owner_id in (('user', limits.user, user_id),
+                                          ('guild', limits.guild, guild_id)):
+            if capacity > 0:
+                bucket = self.get_bucket((action, limits, scope, owner_id), capacity,
+                                         limits.period)
+                # action, that costs more than the limit, needs a full bucket
+                buckets.append((bucket, min(cost, capacity)))
+        return buckets
+
+    def check(self, action: str, limits: ThrottleLimits, user_id: int, guild_id: int,
+              cost: float, take=True) -> float:
+        '''
+        Takes the cost from the user and the guild buckets of the action and returns 0,
+        or returns seconds to wait, if one of them doesn't have enough tokens.
+        With take=False the cost is only checked, call charge when the call does the work.
+        '''
+        buckets = self.get_owner_buckets(action, limits, user_id, guild_id, cost)
+        if not buckets:
+            return 0.0
+        delay = max(bucket.get_delay(tokens) for bucket, tokens in buckets)
+        if delay or not take:
+            return delay
+        for bucket, tokens in buckets:
+            bucket.take(tokens)
+        return 0.0
+
+    def charge(self, action: str, limits: ThrottleLimits, user_id: int, guild_id: int,
+               cost: float):
+        '''Takes the cost of the call, that has passed the check, even below zero'''
+        for bucket, tokens in self.get_owner_buckets(action, limits, user_id, guild_id, cost):
+            bucket.take(tokens)
+
+    def prune(self):
+        '''Drops buckets, that have been refilled completely'''
+        for key in [key for key, bucket in self.buckets.items() if bucket.is_full()]:
+            del self.buckets[key]
@@ -3,230 +3,288 @@
 import re
 from datetime import datetime, timezone, timedelta
 from collections import namedtuple
+from functools import lru_cache
 
 # using pytz requires additional work, it's easier to handle it manually
 # https://en.wikipedia.org/wiki/List_of_time_zone_abbreviations
-# use update_timezones_file() to convert copy-pasted list from wiki to this map
+# use parse_timezones_file() to convert copy-pasted list from wiki to this map
+# offsets are kept as strings, timezone objects are created only for the used ones
 # pylint: disable=line-too-long
-TIMEZONES = {
-    "ACDT" : timezone(timedelta(hours=10, minutes=30)), # Australian Central Daylight Savings Time
-    "ACST" : timezone(timedelta(hours=9, minutes=30)), # Australian Central Standard Time
-    "ACT" : timezone(-timedelta(hours=5, minutes=0)), # Acre Time
-    "ACWST" : timezone(timedelta(hours=8, minutes=45)), # Australian Central Western Standard Time (unofficial)
-    "ADT" : timezone(-timedelta(hours=3, minutes=0)), # Atlantic Daylight Time
-    "AEDT" : timezone(timedelta(hours=11, minutes=0)), # Australian Eastern Daylight Savings Time
-    "AEST" : timezone(timedelta(hours=10, minutes=0)), # Australian Eastern Standard Time
-    "AFT" : timezone(timedelta(hours=4, minutes=30)), # Afghanistan Time
-    "AKDT" : timezone(-timedelta(hours=8, minutes=0)), # Alaska Daylight Time
-    "AKST" : timezone(-timedelta(hours=9, minutes=0)), # Alaska Standard Time
-    "ALMT" : timezone(timedelta(hours=6, minutes=0)), # Alma-Ata Time[1]
-    "AMST" : timezone(-timedelta(hours=3, minutes=0)), # Amazon Summer Time (Brazil)[2]
-    "AMT" : timezone(-timedelta(hours=4, minutes=0)), # Amazon Time (Brazil)[3]
-    "ANAT" : timezone(timedelta(hours=12, minutes=0)), # Anadyr Time[4]
-    "AQTT" : timezone(timedelta(hours=5, minutes=0)), # Aqtobe Time[5]
-    "ART" : timezone(-timedelta(hours=3, minutes=0)), # Argentina Time
-    "AST" : timezone(timedelta(hours=3, minutes=0)), # Arabia Standard Time
-    "AWST" : timezone(timedelta(hours=8, minutes=0)), # Australian Western Standard Time
-    "AZOST" : timezone(timedelta(hours=0, minutes=0)), # Azores Summer Time
-    "AZOT" : timezone(-timedelta(hours=1, minutes=0)), # Azores Standard Time
-    "AZT" : timezone(timedelta(hours=4, minutes=0)), # Azerbaijan Time
-    "BDT" : timezone(timedelta(hours=8, minutes=0)), # Brunei Time
-    "BIOT" : timezone(timedelta(hours=6, minutes=0)), # British Indian Ocean Time
-    "BIT" : timezone(-timedelta(hours=12, minutes=0)), # Baker Island Time
-    "BOT" : timezone(-timedelta(hours=4, minutes=0)), # Bolivia Time
-    "BRST" : timezone(-timedelta(hours=2, minutes=0)), # Brasília Summer Time
-    "BRT" : timezone(-timedelta(hours=3, minutes=0)), # Brasília Time
-    "BST" : timezone(timedelta(hours=6, minutes=0)), # Bangladesh Standard Time
-    "BTT" : timezone(timedelta(hours=6, minutes=0)), # Bhutan Time
-    "CAT" : timezone(timedelta(hours=2, minutes=0)), # Central Africa Time
-    "CCT" : timezone(timedelta(hours=6, minutes=30)), # Cocos Islands Time
-    "CDT" : timezone(-timedelta(hours=5, minutes=0)), # Central Daylight Time (North America)
-    "CEST" : timezone(timedelta(hours=2, minutes=0)), # Central European Summer Time (Cf. HAEC)
-    "CET" : timezone(timedelta(hours=1, minutes=0)), # Central European Time
-    "CHADT" : timezone(timedelta(hours=13, minutes=45)), # Chatham Daylight Time
-    "CHAST" : timezone(timedelta(hours=12, minutes=45)), # Chatham Standard Time
-    "CHOT" : timezone(timedelta(hours=8, minutes=0)), # Choibalsan Standard Time
-    "CHOST" : timezone(timedelta(hours=9, minutes=0)), # Choibalsan Summer Time
-    "CHST" : timezone(timedelta(hours=10, minutes=0)), # Chamorro Standard Time
-    "CHUT" : timezone(timedelta(hours=10, minutes=0)), # Chuuk Time
-    "CIST" : timezone(-timedelta(hours=8, minutes=0)), # Clipperton Island Standard Time
-    "CIT" : timezone(timedelta(hours=8, minutes=0)), # Central Indonesia Time
-    "CKT" : timezone(-timedelta(hours=10, minutes=0)), # Cook Island Time
-    "CLST" : timezone(-timedelta(hours=3, minutes=0)), # Chile Summer Time
-    "CLT" : timezone(-timedelta(hours=4, minutes=0)), # Chile Standard Time
-    "COST" : timezone(-timedelta(hours=4, minutes=0)), # Colombia Summer Time
-    "COT" : timezone(-timedelta(hours=5, minutes=0)), # Colombia Time
-    "CST" : timezone(-timedelta(hours=6, minutes=0)), # Central Standard Time (North America)
-    "CT" : timezone(timedelta(hours=8, minutes=0)), # China Time
-    "CVT" : timezone(-timedelta(hours=1, minutes=0)), # Cape Verde Time
-    "CWST" : timezone(timedelta(hours=8, minutes=45)), # Central Western Standard Time (Australia) unofficial
-    "CXT" : timezone(timedelta(hours=7, minutes=0)), # Christmas Island Time
-    "DAVT" : timezone(timedelta(hours=7, minutes=0)), # Davis Time
-    "DDUT" : timezone(timedelta(hours=10, minutes=0)), # Dumont d'Urville Time
-    "DFT" : timezone(timedelta(hours=1, minutes=0)), # AIX-specific equivalent of Central European Time[NB 1]
-    "EASST" : timezone(-timedelta(hours=5, minutes=0)), # Easter Island Summer Time
-    "EAST" : timezone(-timedelta(hours=6, minutes=0)), # Easter Island Standard Time
-    "EAT" : timezone(timedelta(hours=3, minutes=0)), # East Africa Time
-    "ECT" : timezone(-timedelta(hours=4, minutes=0)), # Eastern Caribbean Time (does not recognise DST)
-    "EDT" : timezone(-timedelta(hours=4, minutes=0)), # Eastern Daylight Time (North America)
-    "EEST" : timezone(timedelta(hours=3, minutes=0)), # Eastern European Summer Time
-    "EET" : timezone(timedelta(hours=2, minutes=0)), # Eastern European Time
-    "EGST" : timezone(timedelta(hours=0, minutes=0)), # Eastern Greenland Summer Time
-    "EGT" : timezone(-timedelta(hours=1, minutes=0)), # Eastern Greenland Time
-    "EIT" : timezone(timedelta(hours=9, minutes=0)), # Eastern Indonesian Time
-    "EST" : timezone(-timedelta(hours=5, minutes=0)), # Eastern Standard Time (North America)
-    "FET" : timezone(timedelta(hours=3, minutes=0)), # Further-eastern European Time
-    "FJT" : timezone(timedelta(hours=12, minutes=0)), # Fiji Time
-    "FKST" : timezone(-timedelta(hours=3, minutes=0)), # Falkland Islands Summer Time
-    "FKT" : timezone(-timedelta(hours=4, minutes=0)), # Falkland Islands Time
-    "FNT" : timezone(-timedelta(hours=2, minutes=0)), # Fernando de Noronha Time
-    "GALT" : timezone(-timedelta(hours=6, minutes=0)), # Galápagos Time
-    "GAMT" : timezone(-timedelta(hours=9, minutes=0)), # Gambier Islands Time
-    "GET" : timezone(timedelta(hours=4, minutes=0)), # Georgia Standard Time
-    "GFT" : timezone(-timedelta(hours=3, minutes=0)), # French Guiana Time
-    "GILT" : timezone(timedelta(hours=12, minutes=0)), # Gilbert Island Time
-    "GIT" : timezone(-timedelta(hours=9, minutes=0)), # Gambier Island Time
-    "GMT" : timezone(timedelta(hours=0, minutes=0)), # Greenwich Mean Time
-    "GST" : timezone(-timedelta(hours=2, minutes=0)), # South Georgia and the South Sandwich Islands Time
-    "GYT" : timezone(-timedelta(hours=4, minutes=0)), # Guyana Time
-    "HDT" : timezone(-timedelta(hours=9, minutes=0)), # Hawaii–Aleutian Daylight Time
-    "HAEC" : timezone(timedelta(hours=2, minutes=0)), # Heure Avancée d'Europe Centrale French-language name for CEST
-    "HST" : timezone(-timedelta(hours=10, minutes=0)), # Hawaii–Aleutian Standard Time
-    "HKT" : timezone(timedelta(hours=8, minutes=0)), # Hong Kong Time
-    "HMT" : timezone(timedelta(hours=5, minutes=0)), # Heard and McDonald Islands Time
-    "HOVST" : timezone(timedelta(hours=8, minutes=0)), # Hovd Summer Time (not used from 2017-present)
-    "HOVT" : timezone(timedelta(hours=7, minutes=0)), # Hovd Time
-    "ICT" : timezone(timedelta(hours=7, minutes=0)), # Indochina Time
-    "IDLW" : timezone(-timedelta(hours=12, minutes=0)), # International Day Line West time zone
-    "IDT" : timezone(timedelta(hours=3, minutes=0)), # Israel Daylight Time
-    "IOT" : timezone(timedelta(hours=3, minutes=0)), # Indian Ocean Time
-    "IRDT" : timezone(timedelta(hours=4, minutes=30)), # Iran Daylight Time
-    "IRKT" : timezone(timedelta(hours=8, minutes=0)), # Irkutsk Time
-    "IRST" : timezone(timedelta(hours=3, minutes=30)), # Iran Standard Time
-    "IST" : timezone(timedelta(hours=5, minutes=30)), # Indian Standard Time
-    "JST" : timezone(timedelta(hours=9, minutes=0)), # Japan Standard Time
-    "KALT" : timezone(timedelta(hours=2, minutes=0)), # Kaliningrad Time
-    "KGT" : timezone(timedelta(hours=6, minutes=0)), # Kyrgyzstan Time
-    "KOST" : timezone(timedelta(hours=11, minutes=0)), # Kosrae Time
-    "KRAT" : timezone(timedelta(hours=7, minutes=0)), # Krasnoyarsk Time
-    "KST" : timezone(timedelta(hours=9, minutes=0)), # Korea Standard Time
-    "LHST" : timezone(timedelta(hours=10, minutes=30)), # Lord Howe Standard Time
-    "LINT" : timezone(timedelta(hours=14, minutes=0)), # Line Islands Time
-    "MAGT" : timezone(timedelta(hours=12, minutes=0)), # Magadan Time
-    "MART" : timezone(-timedelta(hours=9, minutes=30)), # Marquesas Islands Time
-    "MAWT" : timezone(timedelta(hours=5, minutes=0)), # Mawson Station Time
-    "MDT" : timezone(-timedelta(hours=6, minutes=0)), # Mountain Daylight Time (North America)
-    "MET" : timezone(timedelta(hours=1, minutes=0)), # Middle European Time Same zone as CET
-    "MEST" : timezone(timedelta(hours=2, minutes=0)), # Middle European Summer Time Same zone as CEST
-    "MHT" : timezone(timedelta(hours=12, minutes=0)), # Marshall Islands Time
-    "MIST" : timezone(timedelta(hours=11, minutes=0)), # Macquarie Island Station Time
-    "MIT" : timezone(-timedelta(hours=9, minutes=30)), # Marquesas Islands Time
-    "MMT" : timezone(timedelta(hours=6, minutes=30)), # Myanmar Standard Time
-    "MSK" : timezone(timedelta(hours=3, minutes=0)), # Moscow Time
-    "MST" : timezone(timedelta(hours=8, minutes=0)), # Malaysia Standard Time
-    "MUT" : timezone(timedelta(hours=4, minutes=0)), # Mauritius Time
-    "MVT" : timezone(timedelta(hours=5, minutes=0)), # Maldives Time
-    "MYT" : timezone(timedelta(hours=8, minutes=0)), # Malaysia Time
-    "NCT" : timezone(timedelta(hours=11, minutes=0)), # New Caledonia Time
-    "NDT" : timezone(-timedelta(hours=2, minutes=30)), # Newfoundland Daylight Time
-    "NFT" : timezone(timedelta(hours=11, minutes=0)), # Norfolk Island Time
-    "NOVT" : timezone(timedelta(hours=7, minutes=0)), # Novosibirsk Time [9]
-    "NPT" : timezone(timedelta(hours=5, minutes=45)), # Nepal Time
-    "NST" : timezone(-timedelta(hours=3, minutes=30)), # Newfoundland Standard Time
-    "NT" : timezone(-timedelta(hours=3, minutes=30)), # Newfoundland Time
-    "NUT" : timezone(-timedelta(hours=11, minutes=0)), # Niue Time
-    "NZDT" : timezone(timedelta(hours=13, minutes=0)), # New Zealand Daylight Time
-    "NZST" : timezone(timedelta(hours=12, minutes=0)), # New Zealand Standard Time
-    "OMST" : timezone(timedelta(hours=6, minutes=0)), # Omsk Time
-    "ORAT" : timezone(timedelta(hours=5, minutes=0)), # Oral Time
-    "PDT" : timezone(-timedelta(hours=7, minutes=0)), # Pacific Daylight Time (North America)
-    "PET" : timezone(-timedelta(hours=5, minutes=0)), # Peru Time
-    "PETT" : timezone(timedelta(hours=12, minutes=0)), # Kamchatka Time
-    "PGT" : timezone(timedelta(hours=10, minutes=0)), # Papua New Guinea Time
-    "PHOT" : timezone(timedelta(hours=13, minutes=0)), # Phoenix Island Time
-    "PHT" : timezone(timedelta(hours=8, minutes=0)), # Philippine Time
-    "PKT" : timezone(timedelta(hours=5, minutes=0)), # Pakistan Standard Time
-    "PMDT" : timezone(-timedelta(hours=2, minutes=0)), # Saint Pierre and Miquelon Daylight Time
-    "PMST" : timezone(-timedelta(hours=3, minutes=0)), # Saint Pierre and Miquelon Standard Time
-    "PONT" : timezone(timedelta(hours=11, minutes=0)), # Pohnpei Standard Time
-    "PST" : timezone(-timedelta(hours=8, minutes=0)), # Pacific Standard Time (North America)
-    "PYST" : timezone(-timedelta(hours=3, minutes=0)), # Paraguay Summer Time[10]
-    "PYT" : timezone(-timedelta(hours=4, minutes=0)), # Paraguay Time[11]
-    "RET" : timezone(timedelta(hours=4, minutes=0)), # Réunion Time
-    "ROTT" : timezone(-timedelta(hours=3, minutes=0)), # Rothera Research Station Time
-    "SAKT" : timezone(timedelta(hours=11, minutes=0)), # Sakhalin Island Time
-    "SAMT" : timezone(timedelta(hours=4, minutes=0)), # Samara Time
-    "SAST" : timezone(timedelta(hours=2, minutes=0)), # South African Standard Time
-    "SBT" : timezone(timedelta(hours=11, minutes=0)), # Solomon Islands Time
-    "SCT" : timezone(timedelta(hours=4, minutes=0)), # Seychelles Time
-    "SDT" : timezone(-timedelta(hours=10, minutes=0)), # Samoa Daylight Time
-    "SGT" : timezone(timedelta(hours=8, minutes=0)), # Singapore Time
-    "SLST" : timezone(timedelta(hours=5, minutes=30)), # Sri Lanka Standard Time
-    "SRET" : timezone(timedelta(hours=11, minutes=0)), # Srednekolymsk Time
-    "SRT" : timezone(-timedelta(hours=3, minutes=0)), # Suriname Time
-    "SST" : timezone(-timedelta(hours=11, minutes=0)), # Samoa Standard Time
-    "SYOT" : timezone(timedelta(hours=3, minutes=0)), # Showa Station Time
-    "TAHT" : timezone(-timedelta(hours=10, minutes=0)), # Tahiti Time
-    "THA" : timezone(timedelta(hours=7, minutes=0)), # Thailand Standard Time
-    "TFT" : timezone(timedelta(hours=5, minutes=0)), # French Southern and Antarctic Time[12]
-    "TJT" : timezone(timedelta(hours=5, minutes=0)), # Tajikistan Time
-    "TKT" : timezone(timedelta(hours=13, minutes=0)), # Tokelau Time
-    "TLT" : timezone(timedelta(hours=9, minutes=0)), # Timor Leste Time
-    "TMT" : timezone(timedelta(hours=5, minutes=0)), # Turkmenistan Time
-    "TRT" : timezone(timedelta(hours=3, minutes=0)), # Turkey Time
-    "TOT" : timezone(timedelta(hours=13, minutes=0)), # Tonga Time
-    "TVT" : timezone(timedelta(hours=12, minutes=0)), # Tuvalu Time
-    "ULAST" : timezone(timedelta(hours=9, minutes=0)), # Ulaanbaatar Summer Time
-    "ULAT" : timezone(timedelta(hours=8, minutes=0)), # Ulaanbaatar Standard Time
-    "UTC" : timezone(timedelta(hours=0, minutes=0)), # Coordinated Universal Time
-    "UYST" : timezone(-timedelta(hours=2, minutes=0)), # Uruguay Summer Time
-    "UYT" : timezone(-timedelta(hours=3, minutes=0)), # Uruguay Standard Time
-    "UZT" : timezone(timedelta(hours=5, minutes=0)), # Uzbekistan Time
-    "VET" : timezone(-timedelta(hours=4, minutes=0)), # Venezuelan Standard Time
-    "VLAT" : timezone(timedelta(hours=10, minutes=0)), # Vladivostok Time
-    "VOLT" : timezone(timedelta(hours=4, minutes=0)), # Volgograd Time
-    "VOST" : timezone(timedelta(hours=6, minutes=0)), # Vostok Station Time
-    "VUT" : timezone(timedelta(hours=11, minutes=0)), # Vanuatu Time
-    "WAKT" : timezone(timedelta(hours=12, minutes=0)), # Wake Island Time
-    "WAST" : timezone(timedelta(hours=2, minutes=0)), # West Africa Summer Time
-    "WAT" : timezone(timedelta(hours=1, minutes=0)), # West Africa Time
-    "WEST" : timezone(timedelta(hours=1, minutes=0)), # Western European Summer Time
-    "WET" : timezone(timedelta(hours=0, minutes=0)), # Western European Time
-    "WIT" : timezone(timedelta(hours=7, minutes=0)), # Western Indonesian Time
-    "WST" : timezone(timedelta(hours=8, minutes=0)), # Western Standard Time
-    "YAKT" : timezone(timedelta(hours=9, minutes=0)), # Yakutsk Time
-    "YEKT" : timezone(timedelta(hours=5, minutes=0)), # Yekaterinburg Time
+TIMEZONE_OFFSETS = {
+    "ACDT" : "+10:30", # Australian Central Daylight Savings Time
+    "ACST" : "+09:30", # Australian Central Standard Time
+    "ACT" : "-05:00", # Acre Time
+    "ACWST" : "+08:45", # Australian Central Western Standard Time (unofficial)
+    "ADT" : "-03:00", # Atlantic Daylight Time
+    "AEDT" : "+11:00", # Australian Eastern Daylight Savings Time
+    "AEST" : "+10:00", # Australian Eastern Standard Time
+    "AFT" : "+04:30", # Afghanistan Time
+    "AKDT" : "-08:00", # Alaska Daylight Time
+    "AKST" : "-09:00", # Alaska Standard Time
+    "ALMT" : "+06:00", # Alma-Ata Time[1]
+    "AMST" : "-03:00", # Amazon Summer Time (Brazil)[2]
+    "AMT" : "-04:00", # Amazon Time (Brazil)[3]
+    "ANAT" : "+12:00", # Anadyr Time[4]
+    "AQTT" : "+05:00", # Aqtobe Time[5]
+    "ART" : "-03:00", # Argentina Time
+    "AST" : "+03:00", # Arabia Standard Time
+    "AWST" : "+08:00", # Australian Western Standard Time
+    "AZOST" : "+00:00", # Azores Summer Time
+    "AZOT" : "-01:00", # Azores Standard Time
+    "AZT" : "+04:00", # Azerbaijan Time
+    "BDT" : "+08:00", # Brunei Time
+    "BIOT" : "+06:00", # British Indian Ocean Time
+    "BIT" : "-12:00", # Baker Island Time
+    "BOT" : "-04:00", # Bolivia Time
+    "BRST" : "-02:00", # Brasília Summer Time
+    "BRT" : "-03:00", # Brasília Time
+    "BST" : "+06:00", # Bangladesh Standard Time
+    "BTT" : "+06:00", # Bhutan Time
+    "CAT" : "+02:00", # Central Africa Time
+    "CCT" : "+06:30", # Cocos Islands Time
+    "CDT" : "-05:00", # Central Daylight Time (North America)
+    "CEST" : "+02:00", # Central European Summer Time (Cf. HAEC)
+    "CET" : "+01:00", # Central European Time
+    "CHADT" : "+13:45", # Chatham Daylight Time
+    "CHAST" : "+12:45", # Chatham Standard Time
+    "CHOT" : "+08:00", # Choibalsan Standard Time
+    "CHOST" : "+09:00", # Choibalsan Summer Time
+    "CHST" : "+10:00", # Chamorro Standard Time
+    "CHUT" : "+10:00", # Chuuk Time
+    "CIST" : "-08:00", # Clipperton Island Standard Time
+    "CIT" : "+08:00", # Central Indonesia Time
+    "CKT" : "-10:00", # Cook Island Time
+    "CLST" : "-03:00", # Chile Summer Time
+    "CLT" : "-04:00", # Chile Standard Time
+    "COST" : "-04:00", # Colombia Summer Time
+    "COT" : "-05:00", # Colombia Time
+    "CST" : "-06:00", # Central Standard Time (North America)
+    "CT" : "+08:00", # China Time
+    "CVT" : "-01:00", # Cape Verde Time
+    "CWST" : "+08:45", # Central Western Standard Time (Australia) unofficial
+    "CXT" : "+07:00", # Christmas Island Time
+    "DAVT" : "+07:00", # Davis Time
+    "DDUT" : "+10:00", # Dumont d'Urville Time
+    "DFT" : "+01:00", # AIX-specific equivalent of Central European Time[NB 1]
+    "EASST" : "-05:00", # Easter Island Summer Time
+    "EAST" : "-06:00", # Easter Island Standard Time
+    "EAT" : "+03:00", # East Africa Time
+    "ECT" : "-04:00", # Eastern Caribbean Time (does not recognise DST)
+    "EDT" : "-04:00", # Eastern Daylight Time (North America)
+    "EEST" : "+03:00", # Eastern European Summer Time
+    "EET" : "+02:00", # Eastern European Time
+    "EGST" : "+00:00", # Eastern Greenland Summer Time
+    "EGT" : "-01:00", # Eastern Greenland Time
+    "EIT" : "+09:00", # Eastern Indonesian Time
+    "EST" : "-05:00", # Eastern Standard Time (North America)
+    "FET" : "+03:00", # Further-eastern European Time
+    "FJT" : "+12:00", # Fiji Time
+    "FKST" : "-03:00", # Falkland Islands Summer Time
+    "FKT" : "-04:00", # Falkland Islands Time
+    "FNT" : "-02:00", # Fernando de Noronha Time
+    "GALT" : "-06:00", # Galápagos Time
+    "GAMT" : "-09:00", # Gambier Islands Time
+    "GET" : "+04:00", # Georgia Standard Time
+    "GFT" : "-03:00", # French Guiana Time
+    "GILT" : "+12:00", # Gilbert Island Time
+    "GIT" : "-09:00", # Gambier Island Time
+    "GMT" : "+00:00", # Greenwich Mean Time
+    "GST" : "-02:00", # South Georgia and the South Sandwich Islands Time
+    "GYT" : "-04:00", # Guyana Time
+    "HDT" : "-09:00", # Hawaii–Aleutian Daylight Time
+    "HAEC" : "+02:00", # Heure Avancée d'Europe Centrale French-language name for CEST
+    "HST" : "-10:00", # Hawaii–Aleutian Standard Time
+    "HKT" : "+08:00", # Hong Kong Time
+    "HMT" : "+05:00", # Heard and McDonald Islands Time
+    "HOVST" : "+08:00", # Hovd Summer Time (not used from 2017-present)
+    "HOVT" : "+07:00", # Hovd Time
+    "ICT" : "+07:00", # Indochina Time
+    "IDLW" : "-12:00", # International Day Line West time zone
+    "IDT" : "+03:00", # Israel Daylight Time
+    "IOT" : "+03:00", # Indian Ocean Time
+    "IRDT" : "+04:30", # Iran Daylight Time
+    "IRKT" : "+08:00", # Irkutsk Time
+    "IRST" : "+03:30", # Iran Standard Time
+    "IST" : "+05:30", # Indian Standard Time
+    "JST" : "+09:00", # Japan Standard Time
+    "KALT" : "+02:00", # Kaliningrad Time
+    "KGT" : "+06:00", # Kyrgyzstan Time
+    "KOST" : "+11:00", # Kosrae Time
+    "KRAT" : "+07:00", # Krasnoyarsk Time
+    "KST" : "+09:00", # Korea Standard Time
+    "LHST" : "+10:30", # Lord Howe Standard Time
+    "LINT" : "+14:00", # Line Islands Time
+    "MAGT" : "+12:00", # Magadan Time
+    "MART" : "-09:30", # Marquesas Islands Time
+    "MAWT" : "+05:00", # Mawson Station Time
+    "MDT" : "-06:00", # Mountain Daylight Time (North America)
+    "MET" : "+01:00", # Middle European Time Same zone as CET
+    "MEST" : "+02:00", # Middle European Summer Time Same zone as CEST
+    "MHT" : "+12:00", # Marshall Islands Time
+    "MIST" : "+11:00", # Macquarie Island Station Time
+    "MIT" : "-09:30", # Marquesas Islands Time
+    "MMT" : "+06:30", # Myanmar Standard Time
+    "MSK" : "+03:00", # Moscow Time
+    "MST" : "+08:00", # Malaysia Standard Time
+    "MUT" : "+04:00", # Mauritius Time
+    "MVT" : "+05:00", # Maldives Time
+    "MYT" : "+08:00", # Malaysia Time
+    "NCT" : "+11:00", # New Caledonia Time
+    "NDT" : "-02:30", # Newfoundland Daylight Time
+    "NFT" : "+11:00", # Norfolk Island Time
+    "NOVT" : "+07:00", # Novosibirsk Time [9]
+    "NPT" : "+05:45", # Nepal Time
+    "NST" : "-03:30", # Newfoundland Standard Time
+    "NT" : "-03:30", # Newfoundland Time
+    "NUT" : "-11:00", # Niue Time
+    "NZDT" : "+13:00", # New Zealand Daylight Time
+    "NZST" : "+12:00", # New Zealand Standard Time
+    "OMST" : "+06:00", # Omsk Time
+    "ORAT" : "+05:00", # Oral Time
+    "PDT" : "-07:00", # Pacific Daylight Time (North America)
+    "PET" : "-05:00", # Peru Time
+    "PETT" : "+12:00", # Kamchatka Time
+    "PGT" : "+10:00", # Papua New Guinea Time
+    "PHOT" : "+13:00", # Phoenix Island Time
+    "PHT" : "+08:00", # Philippine Time
+    "PKT" : "+05:00", # Pakistan Standard Time
+    "PMDT" : "-02:00", # Saint Pierre and Miquelon Daylight Time
+    "PMST" : "-03:00", # Saint Pierre and Miquelon Standard Time
+    "PONT" : "+11:00", # Pohnpei Standard Time
+    "PST" : "-08:00", # Pacific Standard Time (North America)
+    "PYST" : "-03:00", # Paraguay Summer Time[10]
+    "PYT" : "-04:00", # Paraguay Time[11]
+    "RET" : "+04:00", # Réunion Time
+    "ROTT" : "-03:00", # Rothera Research Station Time
+    "SAKT" : "+11:00", # Sakhalin Island Time
+    "SAMT" : "+04:00", # Samara Time
+    "SAST" : "+02:00", # South African Standard Time
+    "SBT" : "+11:00", # Solomon Islands Time
+    "SCT" : "+04:00", # Seychelles Time
+    "SDT" : "-10:00", # Samoa Daylight Time
+    "SGT" : "+08:00", # Singapore Time
+    "SLST" : "+05:30", # Sri Lanka Standard Time
+    "SRET" : "+11:00", # Srednekolymsk Time
+    "SRT" : "-03:00", # Suriname Time
+    "SST" : "-11:00", # Samoa Standard Time
+    "SYOT" : "+03:00", # Showa Station Time
+    "TAHT" : "-10:00", # Tahiti Time
+    "THA" : "+07:00", # Thailand Standard Time
+    "TFT" : "+05:00", # French Southern and Antarctic Time[12]
+    "TJT" : "+05:00", # Tajikistan Time
+    "TKT" : "+13:00", # Tokelau Time
+    "TLT" : "+09:00", # Timor Leste Time
+    "TMT" : "+05:00", # Turkmenistan Time
+    "TRT" : "+03:00", # Turkey Time
+    "TOT" : "+13:00", # Tonga Time
+    "TVT" : "+12:00", # Tuvalu Time
+    "ULAST" : "+09:00", # Ulaanbaatar Summer Time
+    "ULAT" : "+08:00", # Ulaanbaatar Standard Time
+    "UTC" : "+00:00", # Coordinated Universal Time
+    "UYST" : "-02:00", # Uruguay Summer Time
+    "UYT" : "-03:00", # Uruguay Standard Time
+    "UZT" : "+05:00", # Uzbekistan Time
+    "VET" : "-04:00", # Venezuelan Standard Time
+    "VLAT" : "+10:00", # Vladivostok Time
+    "VOLT" : "+04:00", # Volgograd Time
+    "VOST" : "+06:00", # Vostok Station Time
+    "VUT" : "+11:00", # Vanuatu Time
+    "WAKT" : "+12:00", # Wake Island Time
+    "WAST" : "+02:00", # West Africa Summer Time
+    "WAT" : "+01:00", # West Africa Time
+    "WEST" : "+01:00", # Western European Summer Time
+    "WET" : "+00:00", # Western European Time
+    "WIT" : "+07:00", # Western Indonesian Time
+    "WST" : "+08:00", # Western Standard Time
+    "YAKT" : "+09:00", # Yakutsk Time
+    "YEKT" : "+05:00", # Yekaterinburg Time
 }
 # pylint: enable=line-too-long
 
+# ABBR[±HH[:MM]] expressions, like 'GMT', 'GMT+3' or 'IST−5:30'
+TIMEZONE_PATTERN = re.compile(r'([A-Z]+)(?:([+\-−])(\d{1,2})(?:[:.]?(\d{2}))?)?')
+
+@lru_cache(maxsize=None)
+def get_offset(abbreviation: str) -> timedelta:
+    '''Returns UTC offset of the known timezone, raises KeyError for unknown abbreviation'''
+    offset = TIMEZONE_OFFSETS[abbreviation]
+    hours, minutes = offset[1:].split(':')
+    delta = timedelta(hours=int(hours), minutes=int(minutes))
+    return -delta if offset[0] == '-' else delta
+
 def get_timezone_from_abbr(timezone_abbreviation: str) -> timezone:
     '''parse input string (format is TIMEZONE+/-HOURS[:MINUTES]) and returns according timezone'''
-    timezone_abbreviation = timezone_abbreviation.upper()
-    if '+' in timezone_abbreviation:
-        [zone, offset] = timezone_abbreviation.split('+')
-        zone = TIMEZONES[zone]
-        offset = get_datetime_from_strtime(offset)
-        zone = timezone(zone.utcoffset(None) + timedelta(hours=offset.hour, minutes=offset.minute))
-        return zone
+    return resolve_timezone(timezone_abbreviation.upper())
+
+@lru_cache(maxsize=512)
+def resolve_timezone(expression: str) -> timezone:
+    '''
+    Returns timezone for the uppercase expression.
+    Results are cached, so the same timezone object is shared between calls.
+    Raises KeyError for unknown abbreviation and ValueError for malformed expression.
+    '''
+    match = TIMEZONE_PATTERN.fullmatch(expression)
+    if not match:
+        raise ValueError(f"'{expression}' is not a timezone expression")
 
-    if '-' in timezone_abbreviation:
-        [zone, offset] = timezone_abbreviation.split('-')
-        zone = TIMEZONES[zone]
-        offset = get_datetime_from_strtime(offset)
-        zone = timezone(zone.utcoffset(None) - timedelta(hours=offset.hour, minutes=offset.minute))
-        return zone
+    abbreviation, sign, hours, minutes = match.groups()
+    base_offset = get_offset(abbreviation)
+    if not sign:
+        return timezone(base_offset)
 
-    if '−' in timezone_abbreviation:
-        [zone, offset] = timezone_abbreviation.split('−')
-        zone = TIMEZONES[zone]
-        offset = get_datetime_from_strtime(offset)
-        zone = timezone(zone.utcoffset(None) - timedelta(hours=offset.hour, minutes=offset.minute))
-        return zone
-    return TIMEZONES[timezone_abbreviation]
+    hours = int(hours)
+    minutes = int(minutes or 0)
+    if hours > 23 or minutes > 59:
+        raise ValueError(f"'{expression}' has invalid offset")
+
+    offset = timedelta(hours=hours, minutes=minutes)
+    if sign == '+':
+        return timezone(base_offset + offset)
+    return timezone(base_offset - offset)
+
+# digits are replaced to zeroes to get the shape of the time string, like '0:00 AM'
+SHAPE_TRANSLATION = str.maketrans('0123456789', '0000000000')
+# most common shapes, like '9:15 AM', '21:00' or '9pm'
+FAST_TIME_PATTERN = re.compile(r'(\d{1,2})(?::(\d{2}))?(?: ?(AM|PM))?')
 
 def get_datetime_from_strtime(time: str) -> datetime:
     '''parse input string and returns datetime with hours and minutes from string'''
-    leftover = time.upper()
+    time = time.upper()
+
+    fast_match = FAST_TIME_PATTERN.fullmatch(time)
+    if fast_match:
+        return get_datetime_from_match(fast_match)
+
+    time_format = infer_time_format(time.translate(SHAPE_TRANSLATION))
+    if '0' in time_format:
+        # literal digits from the leftover can't be taken from the shape
+        time_format = infer_time_format.__wrapped__(time)
+    return datetime.strptime(time, time_format)
+
+def get_datetime_from_match(match) -> datetime:
+    '''creates datetime from FAST_TIME_PATTERN match, checking values as strptime does'''
+    hour = int(match.group(1))
+    minute = int(match.group(2) or 0)
+    period = match.group(3)
+
+    if period:
+        if not 1 <= hour <= 12:
+            raise ValueError(f"hour {hour} is out of 12h format range")
+        hour = hour % 12 + (12 if period == 'PM' else 0)
+    elif hour > 23:
+        raise ValueError(f"hour {hour} is out of 24h format range")
+    if minute > 59:
+        raise ValueError(f"minute {minute} is out of range")
+
+    return datetime(1900, 1, 1, hour, minute)
+
+@lru_cache(maxsize=256)
+def infer_time_format(shape: str) -> str:
+    '''
+    Returns strptime format for the time string.
+    Format depends only on the shape of the string, so the result is cached per shape
+    '''
+    leftover = shape.upper()
     time_format = '%H'
 
     hours_end = re.search(r'\D', leftover)
@@ -265,13 +323,13 @@ def get_datetime_from_strtime(time: str) -> datetime:
     if leftover:
         time_format += leftover
 
-    return datetime.strptime(time.upper(), time_format)
+    return time_format
 
 
 TimezoneSetup = namedtuple('TimezoneSetup', ['Abbreviation', 'Offset', 'Name'])
 
 def read_timezones_file(file_name: str, file_encoding='utf-8') -> [TimezoneSetup]:
-    '''reads file with list of timezones and converts to the array for TIMEZONES dict'''
+    '''reads file with list of timezones and converts to the array for TIMEZONE_OFFSETS dict'''
     existing_zones = set()
     result = []
     with open(file_name, encoding=file_encoding) as tz_file:
@@ -292,13 +350,13 @@ def read_timezones_file(file_name: str, file_encoding='utf-8') -> [TimezoneSetup
             if '+' in offset:
                 offset = offset.split('+')[1]
                 time = get_datetime_from_strtime(offset)
-                offset = f'timezone(timedelta(hours={time.hour}, minutes={time.minute}))'
+                offset = f'"+{time:%H:%M}"'
             elif '−' in offset:
                 offset = offset.split('−')[1]
                 time = get_datetime_from_strtime(offset)
-                offset = f'timezone(-timedelta(hours={time.hour}, minutes={time.minute}))'
+                offset = f'"-{time:%H:%M}"'
             elif '±' in offset:
-                offset = 'timezone(timedelta(hours=0, minutes=0))'
+                offset = '"+00:00"'
 
             if abbr in existing_zones:
                 print(f'{abbr} already exists!')
@@ -309,7 +367,7 @@ def read_timezones_file(file_name: str, file_encoding='utf-8') -> [TimezoneSetup
     return result
 
 def parse_timezones_file(input_file_name: str, output_file_name: str, encoding='utf-8'):
-    '''parse timezones file and write it as python dict with timezones to the output file'''
+    '''parse timezones file and write it as python dict with offsets to the output file'''
     timezones = read_timezones_file(input_file_name, encoding)
     print('Start writing to the output file')
     with open(output_file_name, "w", encoding=encoding) as result_file:
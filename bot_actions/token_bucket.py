@@ -0,0 +1,38 @@
+'''File with the token bucket, that limits rate of events'''
+import time
+
+
+class TokenBucket:
+    '''
+    Bucket holds up to capacity tokens and gets capacity tokens back every period seconds.
+    Every event takes a token, so bursts up to capacity are allowed, but not more on average.
+    '''
+
+    def __init__(self, capacity: float, period: float):
+        self.capacity = capacity
+        self.rate = capacity / period  # tokens per second
+        self.tokens = capacity
+        self.updated_at = time.monotonic()
+
+    def refill(self):
+        '''Adds tokens for the time passed since the last update'''
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    def get_delay(self, tokens: float = 1) -> float:
+        '''Returns seconds to wait until the bucket has enough tokens'''
+        self.refill()
+        if self.tokens >= tokens:
+            return 0.0
+        return (tokens - self.tokens) / self.rate
+
+    def take(self, tokens: float = 1):
+        '''Takes tokens from the bucket, it may go below zero to be paid back later'''
+        self.refill()
+        self.tokens -= tokens
+
+    def is_full(self) -> bool:
+        '''Checks if the bucket has been refilled completely, so it doesn't need to be kept'''
+        self.refill()
+        return self.tokens >= self.capacity
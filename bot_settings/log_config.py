@@ -0,0 +1,112 @@
+'''
+Logging setup from the System settings.
+Records are put into the queue by the caller and written by a background thread,
+so slow disks never block the event loop.
+'''
+from datetime import datetime
+import json
+import logging
+from logging.handlers import QueueHandler, QueueListener
+import queue
+
+TEXT_FORMAT = '%(asctime)s %(levelname)s %(name)s %(message)s'
+LOG_FORMATS = ('text', 'json')
+
+# extra argument of the high-volume info lines, they are kept at log_sample_rate
+SAMPLED = {'sampled': True}
+
+
+class SamplingFilter(logging.Filter):
+    '''Keeps about the rate fraction of the sampled info records, other records always pass'''
+
+    def __init__(self, rate: float):
+        super().__init__()
+        # every interval-th record is kept, so the sampled lines are spread evenly
+        self.interval = max(1, round(1 / rate)) if rate > 0 else None
+        self.skipped = 0
+
+    def filter(self, record):
+        if self.interval == 1 or record.levelno > logging.INFO \
+                or not getattr(record, 'sampled', False):
+            return True
+        if self.interval is None:
+            return False
+        self.skipped += 1
+        if self.skipped < self.interval:
+            return False
+        self.skipped = 0
+        return True
+
+
+class JsonFormatter(logging.Formatter):
+    '''Formats the record as a JSON object in one line'''
+
+    def format(self, record):
+        entry = {'time': datetime.utcfromtimestamp(record.created).isoformat() + 'Z',
+                 'level': record.levelname,
+                 'logger': record.name,
+                 'message': record.getMessage()}
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exception'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class LogQueueHandler(QueueHandler):
+    '''
+    Puts records into the queue with their arguments merged into the message,
+    as arguments can change after the call. The rest of formatting is done by the listener.
+    It's the only handler of the root logger, so the record isn't copied.
+    '''
+
+    def prepare(self, record):
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            # tracebacks can't wait, their frames are gone after the call
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+
+def create_formatter(log_format: str) -> logging.Formatter:
+    '''Returns formatter for the log_format setting'''
+    if log_format not in LOG_FORMATS:
+        logging.warning("Unknown log format '%s', text is used", log_format)
+    return JsonFormatter() if log_format == 'json' else logging.Formatter(TEXT_FORMAT)
+
+
+def configure_logging(system_settings, log_file: str = None,
+                      stream_format: str = None) -> QueueListener:
+    '''
+    Replaces handlers of the root logger with the queue, that is written by the background
+    thread to the log_file or to stderr if there is no file. stream_format forces output
+    to stderr in that format, the shard supervisor reads it.
+    Returns started listener, stop it at exit, so queued records are written.
+    '''
+    formatter = create_formatter(system_settings.log_format)
+    handlers = []
+    if log_file:
+        file_handler = logging.FileHandler(log_file, encoding='utf-8')
+        file_handler.setFormatter(formatter)
+        handlers.append(file_handler)
+    if stream_format or not log_file:
+        stream_handler = logging.StreamHandler()
+        stream_handler.setFormatter(logging.Formatter(stream_format) if stream_format
+                                    else formatter)
+        handlers.append(stream_handler)
+
+    # unbounded, so logging never waits for the writer, SimpleQueue (python 3.7) has no locks
+    log_queue = getattr(queue, 'SimpleQueue', queue.Queue)()
+    queue_handler = LogQueueHandler(log_queue)
+    queue_handler.addFilter(SamplingFilter(system_settings.log_sample_rate))
+
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
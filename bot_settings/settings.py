@@ -14,9 +14,15 @@ import json
 from collections import namedtuple
 
 SystemSettings = namedtuple('SystemSettings', ['token', 'command_character', 'admins',
-                                               'characters_limit', 'log_level'])
+                                               'characters_limit', 'log_level',
+                                               'settings_reload_interval', 'max_concurrent_jobs',
+                                               'max_guild_jobs', 'listener_queue_size',
+                                               'listener_batch_size', 'log_file', 'log_format',
+                                               'log_sample_rate'])
 ActionSettings = namedtuple('ActionSettings', ['is_active', 'keywords', 'call_whitelist',
                                                'call_blacklist', 'settings'])
+# Frozen sets of user names, role names and ids, compiled from ActionSettings lists
+PermissionSet = namedtuple('PermissionSet', ['whitelist', 'blacklist'])
 
 class BotSettings:
     """
@@ -37,11 +43,32 @@ class BotSettings:
         self.mutable_config_path = mutable_config_path
 
         # Init fields with default data on the creation
-        self.system_settings = SystemSettings('', '!', ['Desman735#0679', 'KaTaai#9096'], 2000, 20)
+        self.system_settings = SystemSettings('', '!', ['Desman735#0679', 'KaTaai#9096'], 2000, 20,
+                                              30, 4, 1, 1000, 100, '', 'text', 1.0)
         self.action_settings = dict()
         self.action_settings['CountEmoji'] = ActionSettings(True, ['CountEmoji', 'StatEmoji'],
-                                                            [], [], {'days_to_count': 7})
+                                                            [], [],
+                                                            {'days_to_count': 7,
+                                                             'max_window_days': 366,
+                                                             'index_path': 'emoji_index.db',
+                                                             'scan_concurrency': 10,
+                                                             'result_cache_ttl': 600,
+                                                             'result_cache_max_kb': 1024,
+                                                             'count_unicode_emoji': True,
+                                                             'user_limit': 30,
+                                                             'guild_limit': 100,
+                                                             'limit_period': 3600})
         self.action_settings['Help'] = ActionSettings(True, ['help'], [], [], {})
+        self.action_settings['Stats'] = ActionSettings(True, ['stats'], [], [],
+                                                       {'export_file': 'bot_stats.prom',
+                                                        'export_interval': 60})
+        self.keyword_index = dict()
+        self.build_keyword_index()
+        self.admin_set = frozenset()
+        self.permission_sets = dict()
+        # {guild_id: {member_id: {(role_ids, action): is_allowed}}}, see functions.is_action_allowed
+        self.authorization_cache = dict()
+        self.build_permission_sets()
 
         # Try to update settings from file
         if read_on_init:
@@ -64,7 +91,14 @@ class BotSettings:
         command_character = config['System']['command_character']
         characters_limit = int(config['System']['characters_limit'])
         log_level = int(config['System']['log_level'])
-        logging.getLogger().setLevel(log_level)
+        settings_reload_interval = int(config['System']['settings_reload_interval'])
+        max_concurrent_jobs = int(config['System']['max_concurrent_jobs'])
+        max_guild_jobs = int(config['System']['max_guild_jobs'])
+        listener_queue_size = int(config['System']['listener_queue_size'])
+        listener_batch_size = int(config['System']['listener_batch_size'])
+        log_file = config['System']['log_file']
+        log_format = config['System']['log_format']
+        log_sample_rate = float(config['System']['log_sample_rate'])
 
         ignored_action_sections = ['System', 'DEFAULT']
         self.read_action_settings(config, ignored_action_sections)
@@ -89,7 +123,12 @@ class BotSettings:
 
         # init settings structures
         self.system_settings = SystemSettings(token, command_character, admins, characters_limit,
-                                              log_level)
+                                              log_level, settings_reload_interval,
+                                              max_concurrent_jobs, max_guild_jobs,
+                                              listener_queue_size, listener_batch_size,
+                                              log_file, log_format, log_sample_rate)
+        self.build_permission_sets()
+        logging.getLogger().setLevel(log_level)
 
     def read_action_settings(self, config: configparser.ConfigParser, ignored_sections: [str]):
         """reads from config settings for custom actions"""
@@ -147,6 +186,37 @@ class BotSettings:
                                                            blacklist, settings)
             logging.info('Add action %s to possible actions', section)
 
+        self.build_keyword_index()
+
+    def build_keyword_index(self):
+        """
+        Builds the keyword -> action dictionary for command lookup.
+        If few actions are sharing one keyword, the first one is used.
+        """
+        self.keyword_index = dict()
+        for action, setup in self.action_settings.items():
+            for keyword in setup.keywords:
+                keyword = keyword.lower()
+                if keyword in self.keyword_index:
+                    logging.error("Keyword '%s' is used by both %s and %s actions! "
+                                  "Action %s will be used", keyword,
+                                  self.keyword_index[keyword], action,
+                                  self.keyword_index[keyword])
+                    continue
+                self.keyword_index[keyword] = action
+
+    def build_permission_sets(self):
+        """
+        Compiles admins, whitelists and blacklists to frozensets for the permission checks.
+        Entries can be user names, role names or their ids.
+        Clears the authorization cache, as it depends on these sets.
+        """
+        self.admin_set = frozenset(map(str, self.system_settings.admins))
+        self.permission_sets = dict()
+        for action, setup in self.action_settings.items():
+            self.permission_sets[action] = PermissionSet(frozenset(map(str, setup.call_whitelist)),
+                                                         frozenset(map(str, setup.call_blacklist)))
+        self.authorization_cache = dict()
 
     def write_settings(self):
         """Writes current settings to both files, overriding existing settings"""
@@ -157,7 +227,16 @@ class BotSettings:
         config['System'] = {'command_character': self.system_settings.command_character,
                             'admins': self.system_settings.admins,
                             'characters_limit': self.system_settings.characters_limit,
-                            'log_level': self.system_settings.log_level}
+                            'log_level': self.system_settings.log_level,
+                            'settings_reload_interval':
+                                self.system_settings.settings_reload_interval,
+                            'max_concurrent_jobs': self.system_settings.max_concurrent_jobs,
+                            'max_guild_jobs': self.system_settings.max_guild_jobs,
+                            'listener_queue_size': self.system_settings.listener_queue_size,
+                            'listener_batch_size': self.system_settings.listener_batch_size,
+                            'log_file': self.system_settings.log_file,
+                            'log_format': self.system_settings.log_format,
+                            'log_sample_rate': self.system_settings.log_sample_rate}
 
         for action, action_setup in self.action_settings.items():
             if action_setup.settings:
@@ -209,11 +288,39 @@ class BotSettings:
                 system['characters_limit'] = str(self.system_settings.characters_limit)
             if 'log_level' not in system:
                 system['log_level'] = str(self.system_settings.log_level)
+            if 'settings_reload_interval' not in system:
+                system['settings_reload_interval'] = \
+                    str(self.system_settings.settings_reload_interval)
+            if 'max_concurrent_jobs' not in system:
+                system['max_concurrent_jobs'] = str(self.system_settings.max_concurrent_jobs)
+            if 'max_guild_jobs' not in system:
+                system['max_guild_jobs'] = str(self.system_settings.max_guild_jobs)
+            if 'listener_queue_size' not in system:
+                system['listener_queue_size'] = str(self.system_settings.listener_queue_size)
+            if 'listener_batch_size' not in system:
+                system['listener_batch_size'] = str(self.system_settings.listener_batch_size)
+            if 'log_file' not in system:
+                system['log_file'] = str(self.system_settings.log_file)
+            if 'log_format' not in system:
+                system['log_format'] = str(self.system_settings.log_format)
+            if 'log_sample_rate' not in system:
+                system['log_sample_rate'] = str(self.system_settings.log_sample_rate)
         else:
             config['System'] = {'command_character': self.system_settings.command_character,
                                 'admins': self.system_settings.admins,
                                 'characters_limit': self.system_settings.characters_limit,
-                                'log_level': self.system_settings.log_level}
+                                'log_level': self.system_settings.log_level,
+                                'settings_reload_interval':
+                                    self.system_settings.settings_reload_interval,
+                                'max_concurrent_jobs': self.system_settings.max_concurrent_jobs,
+                                'max_guild_jobs': self.system_settings.max_guild_jobs,
+                                'listener_queue_size':
+                                    self.system_settings.listener_queue_size,
+                                'listener_batch_size':
+                                    self.system_settings.listener_batch_size,
+                                'log_file': self.system_settings.log_file,
+                                'log_format': self.system_settings.log_format,
+                                'log_sample_rate': self.system_settings.log_sample_rate}
 
     def update_actions_settings(self, config: configparser.ConfigParser):
         """Updates actions settings sections of the config file"""
@@ -0,0 +1,90 @@
+'''
+The idea is to apply changes of the settings files without restarting the bot.
+Watcher checks modification time of both files and reads them again on change.
+New settings object replaces the old one as a whole and is never changed after that,
+so actions created before the reload keep working with consistent settings.
+'''
+import asyncio
+import configparser
+import logging
+import os
+
+from .settings import BotSettings
+
+# errors, that mean that settings files are malformed
+SETTINGS_ERRORS = (KeyError, ValueError, TypeError, AttributeError, OSError, configparser.Error)
+
+
+def load_settings(config_path: str, mutable_config_path: str) -> BotSettings:
+    """Reads settings from both files without fixing them, raises an error if files are malformed"""
+    bot_settings = BotSettings(config_path, mutable_config_path, read_on_init=False)
+    bot_settings.read_settings()
+    return bot_settings
+
+
+def check_complete(bot_settings: BotSettings, action_names):
+    '''
+    Raises ValueError if the settings miss some of the running actions or all of the keywords,
+    like files cut by a partial write, that can be parsed, but would silence the bot.
+    '''
+    missing = [name for name in action_names if name not in bot_settings.action_settings]
+    if missing:
+        raise ValueError(f"No settings for the actions {', '.join(sorted(missing))}")
+    if not bot_settings.keyword_index:
+        raise ValueError('No keywords for the actions')
+
+
+class SettingsWatcher:
+    """Reloads settings of the owner (object with bot_settings field) when settings files change"""
+
+    def __init__(self, owner, interval: int):
+        self.owner = owner
+        self.interval = interval
+        self.task = None
+        self.file_versions = self.get_file_versions(owner.bot_settings)
+
+    @staticmethod
+    def get_file_versions(bot_settings: BotSettings) -> tuple:
+        """Returns modification times of the settings files"""
+        versions = []
+        for path in (bot_settings.config_path, bot_settings.mutable_config_path):
+            try:
+                versions.append(os.stat(path).st_mtime_ns)
+            except OSError:
+                versions.append(None)
+        return tuple(versions)
+
+    def start(self):
+        """Starts watching in the background, if reload is enabled and not started yet"""
+        if self.interval > 0 and not self.task:
+            self.task = asyncio.ensure_future(self.run())
+
+    async def run(self):
+        """Checks settings files every interval seconds"""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.check()
+
+    async def check(self) -> bool:
+        """Reloads settings if files were changed. Returns True if new settings were applied"""
+        current = self.owner.bot_settings
+        file_versions = self.get_file_versions(current)
+        if file_versions == self.file_versions:
+            return False
+        self.file_versions = file_versions
+
+        # parsing is done in the thread pool to not block the event loop
+        loop = asyncio.get_event_loop()
+        try:
+            new_settings = await loop.run_in_executor(None, load_settings, current.config_path,
+                                                      current.mutable_config_path)
+            check_complete(new_settings, current.action_dict)
+        except SETTINGS_ERRORS as error:
+            logging.error("Can't reload settings files, keeping the previous settings: %r", error)
+            return False
+
+        new_settings.action_dict = current.action_dict
+        self.owner.bot_settings = new_settings
+        logging.info('Settings were reloaded from %s and %s', current.config_path,
+                     current.mutable_config_path)
+        return True
@@ -0,0 +1,130 @@
+"""Script to start the FoODbOT as several processes, each running a part of the shards"""
+import argparse
+import logging
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+BOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+BOT_SCRIPT = os.path.join(BOT_DIRECTORY, 'bot.py')
+
+# crashed workers are restarted after a delay, that doubles with every quick crash
+MIN_RESTART_DELAY = 1
+MAX_RESTART_DELAY = 300
+# worker, that ran for this long before the crash, is considered healthy again
+HEALTHY_UPTIME = 600
+
+
+def split_shards(shard_count: int, process_count: int) -> [[int]]:
+    '''Distributes shard ids between the processes as evenly as possible'''
+    process_count = max(1, min(process_count, shard_count))
+    return [list(range(shard_count))[index::process_count] for index in range(process_count)]
+
+
+class ShardWorker:
+    '''One bot process running some of the shards, its output goes to the supervisor log'''
+
+    def __init__(self, shard_ids: [int], shard_count: int, log_queue: queue.Queue):
+        self.shard_ids = shard_ids
+        self.shard_count = shard_count
+        self.log_queue = log_queue
+        self.name = f"shards {','.join(str(shard_id) for shard_id in shard_ids)}"
+        self.process = None
+        self.started_at = 0
+        self.restart_delay = MIN_RESTART_DELAY
+        self.restart_at = None
+
+    def start(self):
+        '''Starts the bot process and the thread reading its output'''
+        command = [sys.executable, BOT_SCRIPT,
+                   '--shard-ids', ','.join(str(shard_id) for shard_id in self.shard_ids),
+                   '--shard-count', str(self.shard_count)]
+        self.process = subprocess.Popen(command, cwd=BOT_DIRECTORY, stdout=subprocess.PIPE,
+                                        stderr=subprocess.STDOUT, universal_newlines=True)
+        self.started_at = time.monotonic()
+        self.restart_at = None
+        logging.info('Started %s as process %d', self.name, self.process.pid)
+        threading.Thread(target=self.read_output, args=(self.process,), daemon=True).start()
+
+    def read_output(self, process):
+        '''Passes lines of the process output to the log queue'''
+        for line in process.stdout:
+            self.log_queue.put((self.name, line.rstrip('\n')))
+
+    def check(self):
+        '''Schedules restart of the crashed process and restarts it when the time comes'''
+        if self.restart_at is not None:
+            if time.monotonic() >= self.restart_at:
+                self.start()
+            return
+
+        code = self.process.poll()
+        if code is None:
+            return
+        if time.monotonic() - self.started_at >= HEALTHY_UPTIME:
+            self.restart_delay = MIN_RESTART_DELAY
+        logging.error('%s exited with code %d, restarting in %d seconds',
+                      self.name, code, self.restart_delay)
+        self.restart_at = time.monotonic() + self.restart_delay
+        self.restart_delay = min(self.restart_delay * 2, MAX_RESTART_DELAY)
+
+    def stop(self):
+        '''Terminates the process'''
+        if self.process and self.process.poll() is None:
+            self.process.terminate()
+            try:
+                self.process.wait(10)
+            except subprocess.TimeoutExpired:
+                self.process.kill()
+
+
+def log_output(log_queue: queue.Queue):
+    '''
+    Logs output lines of all workers from one thread, so lines don't interleave.
+    Lines are expected in bot.LOG_FORMAT, others (like tracebacks) are logged as they are.
+    '''
+    while True:
+        name, line = log_queue.get()
+        level_name, _, message = line.partition(' ')
+        level = logging.getLevelName(level_name)
+        if not isinstance(level, int):
+            level, message = logging.INFO, line
+        logging.log(level, '[%s] %s', name, message)
+
+
+def main():
+    '''Starts the workers and keeps them running until interrupted'''
+    parser = argparse.ArgumentParser(description='Starts the FoODbOT in sharded mode')
+    parser.add_argument('--shards', type=int, required=True, help='total amount of shards')
+    parser.add_argument('--processes', type=int,
+                        help='amount of processes, one per shard by default')
+    arguments = parser.parse_args()
+    if arguments.shards < 1:
+        parser.error('--shards should be positive')
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    log_queue = queue.Queue()
+    threading.Thread(target=log_output, args=(log_queue,), daemon=True).start()
+
+    workers = [ShardWorker(shard_ids, arguments.shards, log_queue)
+               for shard_ids in split_shards(arguments.shards,
+                                             arguments.processes or arguments.shards)]
+    for worker in workers:
+        worker.start()
+    try:
+        while True:
+            time.sleep(1)
+            for worker in workers:
+                worker.check()
+    except KeyboardInterrupt:
+        logging.info('Stopping the shards')
+    finally:
+        for worker in workers:
+            worker.stop()
+
+
+if __name__ == '__main__':
+    main()
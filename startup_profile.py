@@ -0,0 +1,99 @@
+'''File with the profiler of the bot start: import time of modules and initialization steps'''
+from contextlib import contextmanager
+import importlib.abc
+import sys
+import time
+
+# modules, that took less time to import, are not shown in the report
+MIN_REPORTED_SECONDS = 0.001
+
+
+class TimedLoader(importlib.abc.Loader):
+    '''Loader wrapper, that measures time of the module execution'''
+
+    def __init__(self, loader, profiler):
+        self.loader = loader
+        self.profiler = profiler
+
+    def create_module(self, spec):
+        return self.loader.create_module(spec)
+
+    def exec_module(self, module):
+        with self.profiler.measure_import(module.__name__):
+            self.loader.exec_module(module)
+
+    def __getattr__(self, name):
+        # other loader methods, like get_source or is_package
+        return getattr(self.loader, name)
+
+
+class StartupProfiler(importlib.abc.MetaPathFinder):
+    '''
+    Collects import time of every module imported while it's installed and durations of the
+    marked initialization steps. Import times are exclusive: time of the nested imports
+    is reported for the nested modules.
+    '''
+
+    def __init__(self):
+        self.started_at = time.perf_counter()
+        self.imports = []  # [(module, seconds)]
+        self.steps = []  # [(step, seconds)]
+        self.import_stack = []  # [time spent in nested imports] for the modules being imported
+
+    def install(self):
+        '''Starts measuring imports'''
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self):
+        '''Stops measuring imports'''
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname, path, target=None):
+        '''Finds the module with the other finders and wraps its loader'''
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is not None:
+                if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                    spec.loader = TimedLoader(spec.loader, self)
+                return spec
+        return None
+
+    @contextmanager
+    def measure_import(self, module_name: str):
+        '''Measures import of the module, excluding its nested imports'''
+        self.import_stack.append(0.0)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            total = time.perf_counter() - start
+            nested = self.import_stack.pop()
+            self.imports.append((module_name, total - nested))
+            if self.import_stack:
+                self.import_stack[-1] += total
+
+    @contextmanager
+    def measure(self, step: str):
+        '''Measures the initialization step'''
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.steps.append((step, time.perf_counter() - start))
+
+    def format_report(self) -> str:
+        '''Returns report with the slowest imports and all steps in milliseconds'''
+        total = time.perf_counter() - self.started_at
+        imports_total = sum(seconds for _, seconds in self.imports)
+        lines = [f'Startup took {total * 1000:.1f} ms, '
+                 f'{len(self.imports)} modules imported in {imports_total * 1000:.1f} ms']
+        for module_name, seconds in sorted(self.imports, key=lambda item: -item[1]):
+            if seconds >= MIN_REPORTED_SECONDS:
+                lines.append(f'  import {module_name}: {seconds * 1000:.1f} ms')
+        for step, seconds in self.steps:
+            lines.append(f'  {step}: {seconds * 1000:.1f} ms')
+        return '\n'.join(lines)